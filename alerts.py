@@ -0,0 +1,83 @@
+from concurrent.futures import ThreadPoolExecutor
+from llm_cache import generate_text
+from mail_template import PreparedMessage, render_alert_html
+from mailer import send_bulk, summarize
+from market_data import GLOBAL_TICKERS, get_quotes
+from resources import get_sheet
+from subscribers import active_subscribers, sync_sheet
+import telegram_bot
+from tracing import incr, stage
+
+# ==========================================
+# 🚨 긴급 속보 발송 (관리자 관제실 · 시장 급변 감지기 공용)
+# ==========================================
+PROMPT_VERSION = "alert-v1"
+
+
+def build_alert_prompt(issue_text, quotes):
+    ndx, tnx, vix, krw = (quotes[t] for t in GLOBAL_TICKERS)
+    return f"""너는 경제 비서 '이브'야. [긴급 이슈]: {issue_text}
+    [현재 데이터] 나스닥:{ndx[0]}, 금리:{tnx[0]}%, VIX:{vix[0]}, 환율:{krw[0]}원
+    1. "🚨 [긴급 속보] 안녕하세요, 이브입니다." 로 시작해.
+    2. 이슈가 시장에 미칠 영향을 분석해.
+    3. 절대 마크다운(*, #) 쓰지 말고 HTML <b>, <br>만 사용해."""
+
+
+def fallback_alert_text(issue_text, quotes):
+    # AI 분석이 제한 시간 안에 오지 않으면 지표만 담은 속보로 먼저 내보냅니다
+    ndx, tnx, vix, krw = (quotes[t] for t in GLOBAL_TICKERS)
+    return (f"🚨 [긴급 속보] 안녕하세요, 이브입니다.<br><br><b>{issue_text}</b><br><br>"
+            f"나스닥 {ndx[0]} ({ndx[2]}%) / 미 10년물 금리 {tnx[0]}% / VIX {vix[0]} / 원·달러 환율 {krw[0]}원<br>"
+            f"상세 분석은 이어지는 브리핑에서 전해 드릴게요.")
+
+
+def _generate(model, issue_text, quotes, llm_timeout):
+    if llm_timeout is None:
+        return generate_text(model, build_alert_prompt(issue_text, quotes), version=PROMPT_VERSION)
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="alert-llm")
+    try:
+        future = executor.submit(generate_text, model, build_alert_prompt(issue_text, quotes), version=PROMPT_VERSION)
+        return future.result(timeout=llm_timeout)
+    except Exception as e:
+        incr("fallback.alert_llm")
+        print(f"⚠️ 속보 AI 분석 지연/실패 → 지표 요약으로 발송합니다: {type(e).__name__} {e}")
+        return fallback_alert_text(issue_text, quotes)
+    finally:
+        executor.shutdown(wait=False)
+
+
+def _broadcast_telegram(token, chat_ids, text):
+    # 토큰·채팅방이 없거나 전송 중 오류가 나도 이메일 발송은 계속합니다
+    try:
+        report = telegram_bot.summarize(telegram_bot.broadcast(token, chat_ids, text) if token and chat_ids else [])
+    except Exception as e:
+        print(f"텔레그램 발송 실패: {e}")
+        return {"total": 0, "sent": 0, "failed": 0, "failures": {"*": str(e)}}
+    for chat_id, error in report["failures"].items():
+        print(f"텔레그램 발송 실패 ({chat_id}): {error}")
+    return report
+
+
+def _subscribers(gcp_credentials):
+    try:
+        sync_sheet(get_sheet(gcp_credentials))
+    except Exception as e:
+        print(f"❌ 구글 시트 동기화 실패 (저장된 로컬 명단으로 발송): {e}")
+    return active_subscribers()
+
+
+def send_alert(issue_text, model, sender_email, app_password, gcp_credentials, telegram_token=None, telegram_chats=(), llm_timeout=None):
+    # 시세 → AI 분석(llm_timeout 초 넘으면 지표 요약) → 텔레그램 ∥ 구독자 이메일 동시 발송
+    with stage("alert.send"):
+        quotes = get_quotes(GLOBAL_TICKERS)
+        ai_text = _generate(model, issue_text, quotes, llm_timeout)
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="alert-telegram") as executor:
+            # 📱 텔레그램 발송
+            telegram_future = executor.submit(_broadcast_telegram, telegram_token, telegram_chats,
+                                              f"🚨 [긴급 속보 발생]\n\n이슈: {issue_text}\n\n{ai_text}")
+            # 📧 이메일 대량 발송
+            message = PreparedMessage(f'🚨 [긴급 속보] {issue_text} - 이브(Eve)', sender_email, render_alert_html(ai_text))
+            email_report = summarize(send_bulk(sender_email, app_password, _subscribers(gcp_credentials), message.for_recipient))
+            telegram_report = telegram_future.result()
+    return {"ai_text": ai_text, "email": email_report, "telegram": telegram_report}
@@ -0,0 +1,221 @@
+import functools
+import threading
+import numpy as np
+import pandas as pd
+from market_data import download_closes
+from price_store import PERIOD_OFFSETS
+
+# ==========================================
+# 📐 K-Macro 지표 엔진 (여러 종목을 한 표로 정렬 → 전 종목·전 지표를 배열 연산 몇 번으로 계산 → 새 봉만 증분 갱신)
+# ==========================================
+ANALYTICS_TICKERS = ["^KS11", "KRW=X", "^TNX"]
+NAMES = {"^KS11": "KOSPI", "KRW=X": "원/달러 환율", "^TNX": "미 10년물 금리"}
+HISTORY_PERIOD = "5y"
+# 금리처럼 수준 자체가 %인 지표는 로그수익률 대신 차분(%p)으로 변화량을 봅니다
+RATE_SYMBOLS = {"^TNX"}
+MA_WINDOWS = (20, 60, 120)
+VOL_WINDOWS = (20, 60)
+CORR_WINDOW = 60
+CORR_PAIRS = [("^KS11", "KRW=X"), ("^KS11", "^TNX"), ("KRW=X", "^TNX")]
+TRADING_DAYS = 252
+# 국면 판단 기준 — 20일 변동성이 최근 1년 평균의 VOL_REGIME_RATIO 배 이상이면 고변동성, 고점 대비 낙폭(%)으로 조정/약세장
+VOL_REGIME_WINDOW = 252
+VOL_REGIME_RATIO = 1.3
+CORRECTION_PCT = -10
+BEAR_PCT = -20
+KRW_WEAK_RATIO = 1.02
+FX_LINKED_CORR = -0.5
+# 국면 이름 → (화면·프롬프트 표시명, 판단 기준)
+REGIME_LABELS = {
+    "uptrend": ("📈 KOSPI 상승 추세", "120일선 위 · 20일선 > 60일선"),
+    "downtrend": ("📉 KOSPI 하락 추세", "120일선 아래 · 20일선 < 60일선"),
+    "high_vol": ("🌪️ 고변동성", f"20일 변동성이 1년 평균의 {VOL_REGIME_RATIO}배 이상"),
+    "correction": ("⚠️ 조정 국면", f"고점 대비 {CORRECTION_PCT}% 이하"),
+    "bear": ("🐻 약세장", f"고점 대비 {BEAR_PCT}% 이하"),
+    "krw_weak": ("💸 원화 약세", f"환율이 60일선보다 {round((KRW_WEAK_RATIO - 1) * 100)}% 이상 높음"),
+    "fx_linked": ("🔗 환율 민감 장세", f"KOSPI·환율 {CORR_WINDOW}일 상관계수 {FX_LINKED_CORR} 이하"),
+}
+# 휴장일이 다른 종목을 같은 날짜 축에 맞출 때 직전 종가로 채우는 최대 일수
+FILL_LIMIT = 5
+# 증분 갱신 때 바뀐 봉 앞쪽으로 다시 읽을 행 수 (가장 긴 창이 이어지는 길이)
+LOOKBACK = VOL_REGIME_WINDOW + max(VOL_WINDOWS + MA_WINDOWS) + 1
+# 종목별 지표 열의 순서 — 결과 표는 이 순서대로 [지표 × 종목] 블록이 붙고, 뒤에 corr · regime 이 옵니다
+FIELDS = ["close", "change", *(f"ma{w}" for w in MA_WINDOWS), *(f"vol{w}" for w in VOL_WINDOWS), "peak", "drawdown"]
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _rolling_sum(a, window):
+    # 2차원 배열의 열별 이동 합 — 누적합 한 번으로 모든 열을 동시에 계산 (창 안에 NaN 이 있으면 NaN)
+    valid = ~np.isnan(a)
+    total = np.cumsum(np.where(valid, a, 0.0), axis=0)
+    count = np.cumsum(valid, axis=0)
+    total[window:] = total[window:] - total[:-window]
+    count[window:] = count[window:] - count[:-window]
+    total[count < window] = np.nan
+    return total
+
+
+def aligned_closes(symbols=ANALYTICS_TICKERS, period=HISTORY_PERIOD):
+    # 종목마다 거래일이 달라 생기는 빈칸은 직전 종가로 채워 한 날짜 축에 맞춥니다
+    closes = download_closes(symbols, period).sort_index().astype(float)
+    return closes.ffill(limit=FILL_LIMIT).dropna(how="all")
+
+
+def compute(closes, peak=None):
+    # closes: 날짜 × 종목 종가 표 / peak: 이 구간 직전까지의 종목별 고점 (증분 갱신 시 이어받기)
+    # 반환: 열이 (지표, 종목) 인 표 하나 — close, change, ma*, vol*, peak, drawdown, corr, regime
+    symbols = list(closes.columns)
+    px = closes.to_numpy(dtype=float)
+    rate = np.array([s in RATE_SYMBOLS for s in symbols])
+    n = len(symbols)
+
+    change = np.full_like(px, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change[1:] = np.where(rate, px[1:] - px[:-1], np.log(px[1:] / px[:-1]))
+
+    # 같은 창 길이의 이동 합은 여러 배열을 옆으로 붙여 한 번에 구합니다
+    fields = {"close": px, "change": change}
+    for w in MA_WINDOWS:
+        fields[f"ma{w}"] = _rolling_sum(px, w) / w
+    for w in VOL_WINDOWS:
+        sums = _rolling_sum(np.hstack([change, change * change]), w)
+        s1, s2 = sums[:, :n], sums[:, n:]
+        var = np.maximum(s2 - s1 * s1 / w, 0.0) / (w - 1)
+        # 연율화 — 가격은 %, 금리는 %p
+        fields[f"vol{w}"] = np.sqrt(var * TRADING_DAYS) * np.where(rate, 1.0, 100.0)
+    running = np.fmax.accumulate(px, axis=0)
+    fields["peak"] = running if peak is None else np.fmax(running, peak)
+    fields["drawdown"] = (px / fields["peak"] - 1) * 100
+
+    columns = [(f, s) for f in FIELDS for s in symbols]
+    blocks = [fields[f] for f in FIELDS]
+
+    index = {s: i for i, s in enumerate(symbols)}
+    pairs = [(a, b) for a, b in CORR_PAIRS if a in index and b in index]
+    corr = None
+    if pairs:
+        x = change[:, [index[a] for a, _ in pairs]]
+        y = change[:, [index[b] for _, b in pairs]]
+        p = len(pairs)
+        sums = _rolling_sum(np.hstack([x, y, x * y, x * x, y * y]), CORR_WINDOW)
+        sx, sy, sxy, sxx, syy = (sums[:, i * p:(i + 1) * p] for i in range(5))
+        w = CORR_WINDOW
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = (sxy - sx * sy / w) / np.sqrt((sxx - sx * sx / w) * (syy - sy * sy / w))
+        blocks.append(corr)
+        columns += [("corr", f"{a}~{b}") for a, b in pairs]
+
+    regimes = _regimes(fields, index, corr, pairs)
+    blocks.append(np.column_stack(list(regimes.values())) if regimes else np.empty((len(px), 0)))
+    columns += [("regime", name) for name in regimes]
+
+    frame = pd.DataFrame(np.hstack(blocks), index=closes.index, columns=_columns(tuple(columns)))
+    frame.attrs["symbols"] = tuple(symbols)
+    return frame
+
+
+@functools.lru_cache(maxsize=32)
+def _columns(columns):
+    # 열 구성은 종목 조합마다 같으므로 MultiIndex 는 한 번만 만듭니다 (작은 표에서는 이게 계산보다 비쌉니다)
+    return pd.MultiIndex.from_tuples(columns)
+
+
+def _regimes(fields, index, corr, pairs):
+    # 국면 플래그 (1.0 / 0.0, 판단할 자료가 모자라면 NaN)
+    def flag(cond, *inputs):
+        return np.where(np.any(np.isnan(np.column_stack(inputs)), axis=1), np.nan, cond.astype(float))
+
+    regimes = {}
+    if "^KS11" in index:
+        k = index["^KS11"]
+        close, ma20, ma60, ma120 = (fields[f][:, k] for f in ("close", "ma20", "ma60", "ma120"))
+        regimes["uptrend"] = flag((close > ma120) & (ma20 > ma60), close, ma20, ma60, ma120)
+        regimes["downtrend"] = flag((close < ma120) & (ma20 < ma60), close, ma20, ma60, ma120)
+        vol = fields["vol20"][:, [k]]
+        vol_mean = _rolling_sum(vol, VOL_REGIME_WINDOW)[:, 0] / VOL_REGIME_WINDOW
+        regimes["high_vol"] = flag(vol[:, 0] >= vol_mean * VOL_REGIME_RATIO, vol[:, 0], vol_mean)
+        dd = fields["drawdown"][:, k]
+        regimes["correction"] = flag(dd <= CORRECTION_PCT, dd)
+        regimes["bear"] = flag(dd <= BEAR_PCT, dd)
+    if "KRW=X" in index:
+        close, ma60 = fields["close"][:, index["KRW=X"]], fields["ma60"][:, index["KRW=X"]]
+        regimes["krw_weak"] = flag(close >= ma60 * KRW_WEAK_RATIO, close, ma60)
+    if ("^KS11", "KRW=X") in pairs:
+        c = corr[:, pairs.index(("^KS11", "KRW=X"))]
+        regimes["fx_linked"] = flag(c <= FX_LINKED_CORR, c)
+    return regimes
+
+
+def update(previous, closes):
+    # 이전 결과와 비교해 처음으로 달라진 봉(새 봉 · 장중 갱신된 마지막 봉)부터만 다시 계산해 이어 붙입니다
+    # (열 이름으로 고르면 표 전체를 복사하므로 FIELDS 순서의 블록 위치로 바로 읽습니다)
+    # 기간 창이 밀려 앞쪽 봉이 빠졌으면 고점 · 이동 창 · 결측 채우기가 모두 달라지므로 전체를 다시 계산합니다 (하루 한 번꼴)
+    n = len(closes.columns)
+    if previous is None or previous.attrs.get("symbols") != tuple(closes.columns):
+        return compute(closes)
+    values = previous.to_numpy()
+    pos = previous.index.get_indexer(closes.index)  # 이전 결과에서의 행 위치 (-1 = 새 봉)
+    px = closes.to_numpy(dtype=float)
+    same = pos >= 0
+    same[same] = np.isclose(px[same], values[pos[same], :n], equal_nan=True).all(axis=1)
+    first = len(pos) if same.all() else int(np.argmax(~same))
+    if not np.array_equal(pos[:first], np.arange(first)):
+        return compute(closes)
+    if same.all():
+        return previous if len(pos) == len(previous) else previous.iloc[pos]
+    start = max(0, first - LOOKBACK)
+    peak_at = FIELDS.index("peak") * n
+    peak = values[pos[start - 1], peak_at:peak_at + n] if start else None
+    tail = compute(closes.iloc[start:], peak)
+    frame = pd.DataFrame(np.vstack([values[pos[:first]], tail.to_numpy()[first - start:]]), index=closes.index, columns=previous.columns)
+    frame.attrs["symbols"] = previous.attrs["symbols"]
+    return frame
+
+
+def get_indicators(symbols=ANALYTICS_TICKERS, period=HISTORY_PERIOD):
+    # 프로세스 안에 종목·기간별 결과를 보관하고, 페이지를 열 때마다 저장소의 새 봉만 증분 반영합니다
+    key = (tuple(symbols), period)
+    closes = aligned_closes(symbols, period)
+    with _lock:
+        _cache[key] = update(_cache.get(key), closes)
+        return _cache[key]
+
+
+def recent(frame, period="1y"):
+    # 차트용 최근 구간 (마지막 봉 기준)
+    if period not in PERIOD_OFFSETS or frame.empty:
+        return frame
+    return frame.loc[frame.index >= frame.index[-1] - PERIOD_OFFSETS[period]]
+
+
+def active_regimes(frame):
+    # 마지막 봉에서 켜져 있는 국면 이름들
+    if "regime" not in frame.columns.get_level_values(0):
+        return []
+    return [name for name, on in frame["regime"].iloc[-1].items() if on == 1.0]
+
+
+def prompt_context(frame):
+    # Gemini 프롬프트에 넣을 한 줄 요약들 (값이 아직 없는 지표는 뺍니다)
+    last = frame.iloc[-1]
+    lines = []
+    for sym in frame["close"].columns:
+        unit = "%p" if sym in RATE_SYMBOLS else "%"
+        parts = [f"{last[('close', sym)]:,.2f}"]
+        gaps = [f"{w}일선 {(last[('close', sym)] / last[(f'ma{w}', sym)] - 1) * 100:+.1f}%" for w in MA_WINDOWS if last[(f"ma{w}", sym)] == last[(f"ma{w}", sym)]]
+        if gaps:
+            parts.append("이동평균 대비 " + ", ".join(gaps))
+        if last[("vol20", sym)] == last[("vol20", sym)]:
+            parts.append(f"20일 변동성(연율) {last[('vol20', sym)]:.1f}{unit}")
+        if sym not in RATE_SYMBOLS:
+            parts.append(f"고점 대비 {last[('drawdown', sym)]:+.1f}%")
+        lines.append(f"{NAMES.get(sym, sym)}: " + " / ".join(parts))
+    if "corr" in frame.columns.get_level_values(0):
+        corr = [f"{' ↔ '.join(NAMES.get(s, s) for s in pair.split('~'))} {v:+.2f}" for pair, v in last["corr"].items() if v == v]
+        if corr:
+            lines.append(f"{CORR_WINDOW}일 수익률 상관계수: " + ", ".join(corr))
+    regimes = active_regimes(frame)
+    lines.append("현재 국면: " + (", ".join(f"{REGIME_LABELS[r][0]}({REGIME_LABELS[r][1]})" for r in regimes) if regimes else "뚜렷한 신호 없음"))
+    return "\n".join(lines)
@@ -1,18 +1,20 @@
+import time
+RERUN_STARTED = time.perf_counter()
+
 import streamlit as st
-import yfinance as yf
-import google.generativeai as genai
-import plotly.graph_objects as go
-import pandas as pd
 import os
 import re
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-import json
-import datetime
-import requests
+from llm_cache import stream_text
+import tts
+from subscribers import add_signup, push_later
+from profiles import MAX_TOPICS, TOPICS
+import telegram_bot
+# 🧰 Gemini 모델·구글 시트·HTTP 세션은 프로세스당 한 번만 만들어 재사용 (페이지 전용 라이브러리는 각 페이지에서 import)
+from resources import get_model, get_sheet, record_rerun, timing_summary
+from tracing import stage_summary
 
 st.set_page_config(page_title="EconBrief AI", page_icon="🌤️", layout="wide")
 
@@ -27,7 +29,7 @@ if "kmacro_data" not in st.session_state:
     st.session_state.kmacro_data = None
 
 # ==========================================
-# 📧 이메일 & 텔레그램 발송 함수
+# 📧 이메일 발송 함수 (긴급 속보는 alerts.send_alert)
 # ==========================================
 def send_email(ai_text, news_text):
     sender_email = st.secrets["SENDER_EMAIL"]
@@ -57,15 +59,27 @@ def send_email(ai_text, news_text):
         st.error(f"메일 발송 실패: {e}")
         return False
 
-def send_telegram_message(text):
-    try:
-        token = st.secrets["TELEGRAM_BOT_TOKEN"]
-        chat_id = st.secrets["TELEGRAM_CHAT_ID"]
-        url = f"https://api.telegram.org/bot{token}/sendMessage"
-        clean_text = text.replace("<br>", "\n").replace("<b>", "🔥 ").replace("</b>", " 🔥")
-        requests.post(url, data={"chat_id": chat_id, "text": clean_text, "parse_mode": "HTML"})
-    except Exception as e:
-        print(f"텔레그램 발송 실패: {e}")
+
+def render_streaming_html(chunks, placeholder):
+    # 스트리밍 조각을 받을 때마다 누적 HTML 을 다시 그립니다 (끝이 덜 닫힌 태그는 잘라서 표시)
+    text = ""
+    for chunk in chunks:
+        text += chunk
+        placeholder.markdown(re.sub(r'<[^>]*$', '', text) + " ▌", unsafe_allow_html=True)
+    placeholder.markdown(text, unsafe_allow_html=True)
+    return text
+
+def show_audio_player(path):
+    # 음성은 백그라운드에서 만들어지므로, 준비될 때까지 이 영역만 2초마다 다시 확인합니다
+    if os.path.exists(path):
+        st.audio(path, format='audio/mp3')
+    elif tts.is_pending(path):
+        @st.fragment(run_every=2)
+        def wait_for_audio():
+            if os.path.exists(path) or not tts.is_pending(path):
+                st.rerun()
+            st.caption("🎧 음성 브리핑 준비 중...")
+        wait_for_audio()
 
 is_admin_mode = st.query_params.get("admin") == "true"
 
@@ -91,6 +105,8 @@ with st.sidebar:
             st.markdown("**1️⃣ 이메일 브리핑 무료 구독**")
             login_email = st.text_input("이메일 주소", placeholder="example@gmail.com", label_visibility="collapsed")
             want_newsletter = st.checkbox("📬 매일 아침 브리핑 받기", value=True)
+            # 🎯 관심 분야에 맞춘 브리핑 (최대 2개, 선택하지 않으면 글로벌 기본 브리핑)
+            interests = st.multiselect("관심 분야 (선택, 최대 2개)", list(TOPICS), format_func=lambda t: TOPICS[t]["label"], max_selections=MAX_TOPICS)
             
             if st.button("구독 시작하기", use_container_width=True):
                 allowed_domains = ["gmail.com", "naver.com", "daum.net", "kakao.com", "hanmail.net", "nate.com", "icloud.com"]
@@ -101,11 +117,10 @@ with st.sidebar:
                         if want_newsletter:
                             with st.spinner("명단 등록 중... 💌"):
                                 try:
-                                    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-                                    creds_dict = json.loads(st.secrets["GCP_CREDENTIALS"], strict=False)
-                                    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-                                    client = gspread.authorize(creds)
-                                    client.open("EconBrief 구독자").sheet1.append_row([login_email, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
+                                    # 로컬 명단에 먼저 기록하고, 구글 시트에는 잠시 모았다가 append_rows 로 일괄 업로드
+                                    add_signup(login_email, ", ".join(interests))
+                                    creds_json = st.secrets["GCP_CREDENTIALS"]
+                                    push_later(lambda: get_sheet(creds_json))
                                     st.success("🎉 가입 완료!")
                                     st.balloons()
                                 except Exception as e: 
@@ -131,15 +146,6 @@ with st.sidebar:
         
     menu = st.radio("이동할 페이지를 선택하세요:", menu_options, label_visibility="collapsed")
 
-MY_API_KEY = st.secrets["API_KEY"]
-genai.configure(api_key=MY_API_KEY, transport="rest")
-model = genai.GenerativeModel('gemini-2.5-flash')
-
-def get_data_and_change(ticker):
-    hist = yf.Ticker(ticker).history(period="5d")
-    current, previous = round(hist['Close'].iloc[-1], 2), round(hist['Close'].iloc[-2], 2)
-    return current, round(current - previous, 2), round(((current - previous) / previous) * 100, 2)
-
 # ==========================================
 # 🏠 1. 글로벌 대시보드 (홈 화면)
 # ==========================================
@@ -147,35 +153,24 @@ if menu == "🏠 글로벌 대시보드":
     st.title("🌎 글로벌 경제 대시보드")
     st.write("월스트리트의 핵심 지표와 이브(Eve)의 시황 분석을 한눈에 파악하세요.")
     
-    @st.cache_data(ttl=3600, show_spinner=False)
-    def get_morning_briefing():
-        ndx, tnx, vix, krw = get_data_and_change("^IXIC"), get_data_and_change("^TNX"), get_data_and_change("^VIX"), get_data_and_change("KRW=X")
-        news_titles, news_text = [], ""
-        try:
-            for news in yf.Ticker("SPY").get_news()[:5]:
-                if news.get('title') and news.get('title') not in news_titles:
-                    news_titles.append(news.get('title'))
-                    news_text += f"• {news.get('title')}\n"
-        except: news_text = "뉴스 업데이트 지연"
-        
-        prompt = f"""너는 경제 비서 '이브'야. [데이터] 나스닥:{ndx[0]}({ndx[2]}%), 금리:{tnx[0]}%, VIX:{vix[0]}, 환율:{krw[0]}원
-        [뉴스] {news_text}
-        1. 다정하게 인사하고, 시장 날씨와 핵심 동향을 분석해.
-        2. 절대 단정적인 투자 권유는 피하고 중립적인 어조를 써.
-        3. 마크다운(*, #) 쓰지 말고 HTML <b>, <br>만 사용해."""
-        return ndx, tnx, vix, krw, news_text, model.generate_content(prompt).text
-
+    import plotly.graph_objects as go
+    import briefing
+    from charts import CHART_PERIODS, history_chart
+    model = get_model(st.secrets["API_KEY"])
+    
     # 🌟 TTS 복구 완료!
     if st.button("🔄 최신 글로벌 브리핑 생성", key="get_briefing_btn", type="primary"):
         with st.spinner('글로벌 시장 데이터를 스캔 중입니다...'):
-            ndx, tnx, vix, krw, news_text, ai_text = get_morning_briefing()
-            
-            # 오디오 생성 로직 원상복구
-            audio_text = re.sub(r'<[^>]+>', '', ai_text).replace("☀️", "").replace("☁️", "").replace("☔", "").replace("☕", "")
-            with open("script.txt", "w", encoding="utf-8") as f: f.write(audio_text)
-            os.system('edge-tts --file script.txt --voice ko-KR-SunHiNeural --rate=-10% --write-media briefing_audio.mp3')
-            
-            st.session_state.briefing_data = {"ndx": ndx, "tnx": tnx, "vix": vix, "krw": krw, "news_text": news_text, "ai_text": ai_text}
+            # 📦 크론/다른 방문자가 만든 신선한 브리핑 스냅샷이 있으면 그대로 사용 (파일 한 번 읽기)
+            artifact = briefing.load_latest(st.secrets.get("BRIEFING_URL"))
+            if briefing.is_fresh(artifact):
+                inputs, prompt, ai_text = artifact, None, artifact["ai_text"]
+            else:
+                # 오래됐으면 새로 수집하고, AI 분석(ai_text)은 아래 본문 영역에서 스트리밍으로 채웁니다
+                inputs = briefing.collect_inputs()
+                prompt, ai_text = briefing.build_prompt(inputs), None
+            q = inputs["quotes"]
+            st.session_state.briefing_data = {"ndx": q["^IXIC"], "tnx": q["^TNX"], "vix": q["^VIX"], "krw": q["KRW=X"], "quotes": q, "news_text": inputs["news_text"], "news_keys": inputs.get("news_keys", []), "prompt": prompt, "ai_text": ai_text}
 
     if st.session_state.briefing_data:
         d = st.session_state.briefing_data
@@ -191,19 +186,7 @@ if menu == "🏠 글로벌 대시보드":
         # 🖥️ 하단 레이아웃
         col_main, col_side = st.columns([7, 3])
         
-        with col_main:
-            col_t, col_a = st.columns([2, 1])
-            with col_t: st.subheader("💡 이브(Eve)의 시황 브리핑")
-            with col_a:
-                if os.path.exists("briefing_audio.mp3"):
-                    st.audio("briefing_audio.mp3", format='audio/mp3')
-            
-            st.markdown(d['ai_text'], unsafe_allow_html=True)
-            
-            if st.button("📨 내 이메일로 이 브리핑 보내기"):
-                send_email(d['ai_text'], d['news_text'])
-                st.toast("✅ 메일이 성공적으로 발송되었습니다!")
-                
+        # 스트리밍이 도는 동안에도 보이도록 사이드 영역을 먼저 그립니다
         with col_side:
             st.subheader("🚨 현재 시장 온도")
             fig = go.Figure(go.Indicator(
@@ -214,6 +197,36 @@ if menu == "🏠 글로벌 대시보드":
             st.plotly_chart(fig, use_container_width=True)
             st.subheader("📰 헤드라인")
             st.info(d['news_text'].replace("\n", "\n\n"))
+        
+        with col_main:
+            col_t, col_a = st.columns([2, 1])
+            with col_t: st.subheader("💡 이브(Eve)의 시황 브리핑")
+            
+            if d['ai_text'] is None:
+                d['ai_text'] = render_streaming_html(stream_text(model, d['prompt'], version=briefing.PROMPT_VERSION), st.empty())
+                # 완성된 브리핑을 스냅샷으로 저장해 다음 방문자는 생성 없이 바로 읽습니다
+                audio_file = os.path.basename(tts.audio_path(tts.clean_script(d['ai_text'])))
+                briefing.save(briefing.new_artifact(d, d['ai_text'], audio_file))
+            else:
+                st.markdown(d['ai_text'], unsafe_allow_html=True)
+            
+            # 오디오는 스크립트 해시별 MP3 로 백그라운드 생성 (같은 브리핑이면 파일 재사용)
+            with col_a:
+                show_audio_player(tts.request_audio(tts.clean_script(d['ai_text']), st.secrets.get("BRIEFING_URL")))
+            
+            if st.button("📨 내 이메일로 이 브리핑 보내기"):
+                send_email(d['ai_text'], d['news_text'])
+                st.toast("✅ 메일이 성공적으로 발송되었습니다!")
+            
+            # 📈 지표 추이 (기간 선택 · 시리즈당 CHART_POINTS 개 이하로 다운샘플)
+            st.subheader("📈 지표 추이")
+            chart_names = {"^IXIC": "🇺🇸 나스닥", "KRW=X": "💵 원/달러 환율", "^TNX": "📈 미 10년물 금리", "^VIX": "🚨 공포지수(VIX)"}
+            col_sym, col_period = st.columns([1, 2])
+            with col_sym:
+                symbol = st.selectbox("지표", list(chart_names), format_func=chart_names.get, key="dash_chart_symbol")
+            with col_period:
+                period = CHART_PERIODS[st.radio("기간", list(CHART_PERIODS), index=2, horizontal=True, key="dash_chart_period")]
+            st.line_chart(history_chart(symbol, period).rename(chart_names[symbol]))
 
 # ==========================================
 # 🇰🇷 2. K-Macro 딥다이브 
@@ -222,19 +235,28 @@ elif menu == "🇰🇷 K-Macro 딥다이브":
     st.title("🇰🇷 K-Macro (국내 거시경제) 딥다이브")
     st.write("KOSPI 흐름과 원/달러 환율 등 대한민국 경제의 체력을 깊이 있게 분석합니다.")
     
+    from market_data import KOREA_TICKERS, get_quotes
+    import analytics
+    from charts import CHART_PERIODS, indicator_chart
+    model = get_model(st.secrets["API_KEY"])
+    
     if st.button("📊 KOSPI 및 환율 심층 분석하기", type="primary"):
         with st.spinner('한국 증시와 환율 데이터를 수집 중입니다...'):
-            ks11 = get_data_and_change("^KS11")
-            kq11 = get_data_and_change("^KQ11")
-            krw = get_data_and_change("KRW=X")
-            kospi_hist = yf.Ticker("^KS11").history(period="1mo")
+            quotes = get_quotes(KOREA_TICKERS)
+            ks11, kq11, krw = (quotes[t] for t in KOREA_TICKERS)
+            # 📐 KOSPI·환율·미 금리 5년치 지표 (프로세스 안에서 새 봉만 증분 계산)
+            indicators = analytics.get_indicators()
             
             prompt = f"""너는 거시경제 전문가 '이브'야. 
             [한국 데이터] KOSPI:{ks11[0]}({ks11[2]}%), KOSDAQ:{kq11[0]}({kq11[2]}%), 원/달러환율:{krw[0]}원
+            [5년 지표 요약]
+            {analytics.prompt_context(indicators)}
             1. 현재 환율이 수출입 기업과 KOSPI에 미치는 영향을 분석해.
-            2. 한국은행(BOK)의 통화 정책 스탠스나 국내 물가(CPI) 우려에 대해 간략히 코멘트해.
-            3. 마크다운 쓰지 말고 <b>와 <br>만 사용해."""
-            st.session_state.kmacro_data = {"ks11": ks11, "kq11": kq11, "krw": krw, "chart": kospi_hist, "ai": model.generate_content(prompt).text}
+            2. 위 변동성·고점 대비 낙폭·상관계수·국면 신호를 근거로 지금 시장의 위험도를 짚어줘.
+            3. 한국은행(BOK)의 통화 정책 스탠스나 국내 물가(CPI) 우려에 대해 간략히 코멘트해.
+            4. 마크다운 쓰지 말고 <b>와 <br>만 사용해."""
+            # 리포트(ai)는 아래 리포트 영역에서 스트리밍으로 채웁니다
+            st.session_state.kmacro_data = {"ks11": ks11, "kq11": kq11, "krw": krw, "indicators": indicators, "prompt": prompt, "ai": None}
 
     if st.session_state.kmacro_data:
         k = st.session_state.kmacro_data
@@ -245,11 +267,30 @@ elif menu == "🇰🇷 K-Macro 딥다이브":
         st.divider()
         col1, col2 = st.columns([1, 1])
         with col1:
-            st.subheader("📈 KOSPI 최근 1개월 추이")
-            st.line_chart(k['chart']['Close'], color="#ff4b4b")
+            st.subheader("📈 KOSPI 추세 · 위험 지표")
+            # 📉 긴 기간도 시리즈당 CHART_POINTS 개 이하로 줄여 보냅니다 (기간·해상도별 캐시)
+            period = CHART_PERIODS[st.radio("기간", list(CHART_PERIODS), index=2, horizontal=True, key="kmacro_period")]
+            source = analytics.get_indicators(period="max") if period == "max" else k['indicators']
+            tab_ma, tab_dd, tab_vol, tab_corr = st.tabs(["이동평균", "고점 대비 낙폭", "변동성", "상관계수"])
+            with tab_ma:
+                st.line_chart(indicator_chart(source, [(f, "^KS11") for f in ("close", "ma20", "ma60", "ma120")], ["KOSPI", "20일선", "60일선", "120일선"], period, method="lttb"),
+                              color=["#ff4b4b", "#ffa94d", "#74c0fc", "#868e96"])
+            with tab_dd:
+                st.area_chart(indicator_chart(source, [("drawdown", "^KS11"), ("drawdown", "KRW=X")], ["KOSPI (%)", "원/달러 환율 (%)"], period))
+            with tab_vol:
+                st.line_chart(indicator_chart(source, [("vol20", "^KS11"), ("vol20", "KRW=X")], ["KOSPI 20일 (%)", "원/달러 환율 20일 (%)"], period))
+            with tab_corr:
+                pairs = analytics.CORR_PAIRS
+                st.line_chart(indicator_chart(source, [("corr", f"{a}~{b}") for a, b in pairs],
+                                              [f"{analytics.NAMES[a]} ↔ {analytics.NAMES[b]}" for a, b in pairs], period))
+            regimes = analytics.active_regimes(k['indicators'])
+            st.caption("🧭 현재 국면: " + (" · ".join(f"{analytics.REGIME_LABELS[r][0]} ({analytics.REGIME_LABELS[r][1]})" for r in regimes) if regimes else "뚜렷한 신호 없음"))
         with col2:
             st.subheader("💡 K-Macro 심층 리포트")
-            st.markdown(k['ai'], unsafe_allow_html=True)
+            if k['ai'] is None:
+                k['ai'] = render_streaming_html(stream_text(model, k['prompt'], version="kmacro-v1"), st.empty())
+            else:
+                st.markdown(k['ai'], unsafe_allow_html=True)
             st.caption("※ 참고: 향후 한국은행 OPEN API 연동을 통해 실시간 BSI 및 CPI 지표가 추가될 예정입니다.")
 
 # ==========================================
@@ -303,6 +344,13 @@ elif menu == "🛠️ 관리자 관제실 (Admin)":
     if admin_pw:
         if admin_pw == st.secrets["ADMIN_PASSWORD"]:
             st.success("✅ 최고 관리자 인증 완료.")
+            from alerts import send_alert
+            model = get_model(st.secrets["API_KEY"])
+            
+            with st.expander("⏱️ 앱 응답 속도 (콜드 스타트 / 페이지별 재실행 시간)"):
+                st.json(timing_summary())
+            with st.expander("🔍 단계별 소요 시간 (시세·뉴스·Gemini·TTS·시트·메일·텔레그램)"):
+                st.json(stage_summary())
             with st.container(border=True):
                 issue_text = st.text_input("현재 발생한 긴급 이슈", placeholder="예: 연준 긴급 금리 인하 발표")
                 if st.button("🚨 전 구독자 이메일 & 텔레그램 속보 동시 발송!", type="primary", use_container_width=True):
@@ -311,55 +359,27 @@ elif menu == "🛠️ 관리자 관제실 (Admin)":
                     else:
                         with st.spinner("발송 준비 중... (이메일 및 텔레그램)"):
                             try:
-                                MY_API_KEY = st.secrets["API_KEY"]
-                                genai.configure(api_key=MY_API_KEY, transport="rest")
-                                model = genai.GenerativeModel('gemini-2.5-flash')
-                                
-                                ndx, tnx, vix, krw = get_data_and_change("^IXIC"), get_data_and_change("^TNX"), get_data_and_change("^VIX"), get_data_and_change("KRW=X")
-                                
-                                prompt = f"""너는 경제 비서 '이브'야. [긴급 이슈]: {issue_text}
-                                [현재 데이터] 나스닥:{ndx[0]}, 금리:{tnx[0]}%, VIX:{vix[0]}, 환율:{krw[0]}원
-                                1. "🚨 [긴급 속보] 안녕하세요, 이브입니다." 로 시작해.
-                                2. 이슈가 시장에 미칠 영향을 분석해.
-                                3. 절대 마크다운(*, #) 쓰지 말고 HTML <b>, <br>만 사용해."""
-                                ai_text = model.generate_content(prompt).text
-                                
-                                # 📱 텔레그램 발송
-                                telegram_msg = f"🚨 [긴급 속보 발생]\n\n이슈: {issue_text}\n\n{ai_text}"
-                                send_telegram_message(telegram_msg)
-                                
-                                # 📧 이메일 대량 발송
-                                scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-                                creds_dict = json.loads(st.secrets["GCP_CREDENTIALS"], strict=False)
-                                creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-                                client = gspread.authorize(creds)
-                                sheet = client.open("EconBrief 구독자").sheet1
-                                emails_data = sheet.col_values(1)
-                                subscribers = list(set([e for e in emails_data[1:] if "@" in e]))
-                                
-                                sender_email = st.secrets["SENDER_EMAIL"]
-                                app_password = st.secrets["APP_PASSWORD"]
-                                
-                                with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-                                    server.login(sender_email, app_password)
-                                    success_cnt = 0
-                                    for receiver in subscribers:
-                                        msg = MIMEMultipart()
-                                        msg['Subject'] = f'🚨 [긴급 속보] {issue_text} - 이브(Eve)'
-                                        msg['From'] = sender_email
-                                        msg['To'] = receiver
-                                        html_content = f"<html><body>{ai_text}<hr><p style='color:gray; font-size:12px;'><i>[면책 조항] 본 긴급 속보는 투자 참고용이며 법적 증빙으로 사용될 수 없습니다.</i></p></body></html>"
-                                        msg.attach(MIMEText(html_content, 'html'))
-                                        try:
-                                            server.send_message(msg)
-                                            success_cnt += 1
-                                        except: pass
-                                st.success(f"🎉 총 {success_cnt}명 이메일 발송 완료 및 텔레그램 속보 전송 완료!")
+                                # 📱 텔레그램 + 📧 이메일 동시 발송 (TELEGRAM_CHAT_ID 에 쉼표로 여러 채팅방/채널 가능, 긴 글은 자동 분할)
+                                result = send_alert(issue_text, model, st.secrets["SENDER_EMAIL"], st.secrets["APP_PASSWORD"], st.secrets["GCP_CREDENTIALS"],
+                                                    st.secrets.get("TELEGRAM_BOT_TOKEN"), telegram_bot.parse_chat_ids(st.secrets.get("TELEGRAM_CHAT_ID")))
+                                report, tg_report = result["email"], result["telegram"]
+                                st.success(f"🎉 총 {report['sent']}명 이메일 발송 완료 및 텔레그램 속보 {tg_report['sent']}/{tg_report['total']}곳 전송 완료!")
+                                if report['failed']:
+                                    with st.expander(f"⚠️ 발송 실패 {report['failed']}건 상세 보기"):
+                                        st.json(report['failures'])
+                                if tg_report['failures']:
+                                    with st.expander(f"⚠️ 텔레그램 전송 실패 {len(tg_report['failures'])}건 상세 보기"):
+                                        st.json(tg_report['failures'])
                             except Exception as e:
                                 st.error(f"오류: {e}")
         else:
             st.error("비밀번호가 일치하지 않습니다.")
 
+# ==========================================
+# ⏱️ 재실행 소요 시간 기록 (콜드 스타트 / 페이지별 렌더링 지연 추적)
+# ==========================================
+record_rerun(menu, time.perf_counter() - RERUN_STARTED)
+
 
 
 
@@ -0,0 +1,86 @@
+import argparse
+import math
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import analytics
+
+# ==========================================
+# ⏱️ K-Macro 지표 엔진 벤치마크 (종목별·날짜별 파이썬 반복 vs 배열 일괄 계산 vs 새 봉 증분 갱신)
+# 실행: python benchmarks/bench_analytics.py [--years 5,10,20] [--symbols 3,10]
+# ==========================================
+
+
+def synthetic_closes(years, symbols, seed=11):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=years * analytics.TRADING_DAYS)
+    names = (analytics.ANALYTICS_TICKERS + [f"SYM{i}" for i in range(symbols)])[:symbols]
+    return pd.DataFrame({s: 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index)))) for s in names}, index=index)
+
+
+def loop_baseline(closes):
+    # 페이지를 열 때마다 종목·날짜별로 창을 다시 훑는 단순 구현 (같은 지표: 이동평균 · 변동성 · 낙폭 · 상관계수)
+    cols = {s: closes[s].tolist() for s in closes.columns}
+    rets = {s: [math.nan] + [math.log(b / a) for a, b in zip(v, v[1:])] for s, v in cols.items()}
+    out = {}
+    for s, v in cols.items():
+        for w in analytics.MA_WINDOWS:
+            out[f"ma{w}", s] = [sum(v[i - w + 1:i + 1]) / w if i >= w - 1 else math.nan for i in range(len(v))]
+        for w in analytics.VOL_WINDOWS:
+            vol = []
+            for i in range(len(v)):
+                window = rets[s][i - w + 1:i + 1] if i >= w else []
+                mean = sum(window) / w if window else 0
+                vol.append(math.sqrt(sum((x - mean) ** 2 for x in window) / (w - 1) * 252) * 100 if window else math.nan)
+            out[f"vol{w}", s] = vol
+        peak, dd = -math.inf, []
+        for x in v:
+            peak = max(peak, x)
+            dd.append((x / peak - 1) * 100)
+        out["drawdown", s] = dd
+    w = analytics.CORR_WINDOW
+    for a, b in [(a, b) for a, b in analytics.CORR_PAIRS if a in cols and b in cols]:
+        corr = []
+        for i in range(len(rets[a])):
+            if i < w:
+                corr.append(math.nan)
+                continue
+            x, y = rets[a][i - w + 1:i + 1], rets[b][i - w + 1:i + 1]
+            mx, my = sum(x) / w, sum(y) / w
+            cov = sum((p - mx) * (q - my) for p, q in zip(x, y))
+            corr.append(cov / math.sqrt(sum((p - mx) ** 2 for p in x) * sum((q - my) ** 2 for q in y)))
+        out["corr", f"{a}~{b}"] = corr
+    return out
+
+
+def timed(fn, repeat=5):
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="K-Macro 지표 엔진 벤치마크")
+    parser.add_argument("--years", default="5,10,20", help="이력 길이(년, 쉼표 구분)")
+    parser.add_argument("--symbols", default="3,10", help="종목 수 (쉼표 구분)")
+    parser.add_argument("--skip-loop", action="store_true", help="느린 파이썬 반복 기준선은 건너뜀")
+    args = parser.parse_args()
+
+    print(f"{'종목':>4} {'년':>4} {'봉':>7} {'파이썬 반복':>12} {'일괄 계산':>10} {'새 봉 증분':>10} {'변화 없음':>10}")
+    for symbols in [int(s) for s in args.symbols.split(",")]:
+        for years in [int(y) for y in args.years.split(",")]:
+            closes = synthetic_closes(years, symbols)
+            previous = analytics.compute(closes.iloc[:-1])
+            full = analytics.compute(closes)
+            loop_ms = math.nan if args.skip_loop else timed(lambda: loop_baseline(closes), repeat=1)
+            batch_ms = timed(lambda: analytics.compute(closes))
+            incremental_ms = timed(lambda: analytics.update(previous, closes))
+            unchanged_ms = timed(lambda: analytics.update(full, closes))
+            print(f"{symbols:>4} {years:>4} {len(closes):>7,} {loop_ms:>10,.1f}ms {batch_ms:>8,.1f}ms {incremental_ms:>8,.1f}ms {unchanged_ms:>8,.2f}ms")
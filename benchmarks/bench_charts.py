@@ -0,0 +1,69 @@
+import argparse
+import logging
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("EVE_TRACE_LOG", "0")
+import charts
+
+# ==========================================
+# ⏱️ 차트 다운샘플링 벤치마크 (원본 vs CHART_POINTS 개 — 브라우저로 가는 차트 메시지 크기 · 서버 렌더 시간)
+# 실행: python benchmarks/bench_charts.py [--series 1,4] [--points 500]
+# 메시지 크기는 Streamlit AppTest 로 실제 st.line_chart 를 그려 전송 프로토콜 바이트를 잽니다
+# (브라우저 그리기 시간은 점 개수에 비례하므로 점 개수를 함께 표시)
+# ==========================================
+PERIODS = {"1y": 252, "5y": 252 * 5, "max(30y)": 252 * 30}
+
+
+def synthetic(rows, series, seed=5):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=rows)
+    return pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (rows, series)), axis=0)), index=index,
+                        columns=[f"series{i}" for i in range(series)])
+
+
+def _script():
+    import time
+    import streamlit as st
+    started = time.perf_counter()
+    st.line_chart(st.session_state.chart_data)
+    st.session_state.render_ms = (time.perf_counter() - started) * 1000
+
+
+def render(data, repeat=3):
+    # st.line_chart 호출(데이터 변환 · 직렬화)에 걸린 서버 시간(repeat 회 중 최솟값)과, 브라우저로 보내는 차트 메시지 크기
+    from streamlit.testing.v1 import AppTest
+
+    best = float("inf")
+    for _ in range(repeat):
+        at = AppTest.from_function(_script, default_timeout=120)
+        at.session_state.chart_data = data
+        at.run()
+        best = min(best, at.session_state.render_ms)
+    return at.get("vega_lite_chart")[0].proto.ByteSize(), best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="차트 다운샘플링 벤치마크")
+    parser.add_argument("--series", default="1,4", help="한 차트의 시리즈 수 (쉼표 구분)")
+    parser.add_argument("--points", type=int, default=charts.CHART_POINTS, help="시리즈당 최대 점 수")
+    args = parser.parse_args()
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    render(synthetic(10, 1), repeat=1)  # 첫 호출의 import · 초기화 시간 제외
+
+    print(f"{'시리즈':>5} {'기간':>9} {'방식':>7} {'점':>7} {'메시지':>10} {'렌더':>9} {'샘플링':>8}")
+    for series in [int(s) for s in args.series.split(",")]:
+        for period, rows in PERIODS.items():
+            data = synthetic(rows, series)
+            size, ms = render(data)
+            print(f"{series:>5} {period:>9} {'원본':>7} {len(data):>7,} {size / 1024:>8,.1f}KB {ms:>7,.1f}ms {'-':>8}")
+            for method in ("lttb", "minmax"):
+                started = time.perf_counter()
+                sampled = charts.downsample(data, args.points, method)
+                sample_ms = (time.perf_counter() - started) * 1000
+                size, ms = render(sampled)
+                print(f"{series:>5} {period:>9} {method:>7} {len(sampled):>7,} {size / 1024:>8,.1f}KB {ms:>7,.1f}ms {sample_ms:>6,.1f}ms")
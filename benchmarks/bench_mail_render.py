@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import tracemalloc
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mail_template import PreparedMessage, render_briefing_html
+
+# ==========================================
+# ⏱️ 마이크로 벤치마크: 수신자별 MIME 재생성 vs 1회 렌더링
+# 실행: python benchmarks/bench_mail_render.py [수신자 수]
+# ==========================================
+SENDER = "eve@example.com"
+SUBJECT = "🌤️ 이브(Eve)의 모닝 브리핑 (벤치마크)"
+AI_TEXT = "안녕하세요! 여러분의 경제 비서 이브입니다.<br>" + "<b>오늘의 시장 날씨</b>는 맑음입니다.<br>" * 60
+
+
+def per_recipient(receivers):
+    # 기존 방식: 수신자마다 MIMEMultipart 생성 + 템플릿 렌더링 + 직렬화
+    for receiver in receivers:
+        msg = MIMEMultipart()
+        msg['Subject'] = SUBJECT
+        msg['From'] = SENDER
+        msg['To'] = receiver
+        msg.attach(MIMEText(render_briefing_html(AI_TEXT), 'html'))
+        msg.as_bytes()
+
+
+def prepared_once(receivers):
+    message = PreparedMessage(SUBJECT, SENDER, render_briefing_html(AI_TEXT))
+    for receiver in receivers:
+        message.for_recipient(receiver)
+
+
+def measure(fn, receivers):
+    # 시간과 최대 메모리는 따로 잽니다 (tracemalloc 이 켜져 있으면 할당마다 추적 비용이 붙어 시간이 왜곡됨)
+    start = time.perf_counter()
+    fn(receivers)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(receivers)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    receivers = [f"user{i}@example.com" for i in range(n)]
+    base_t, base_m = measure(per_recipient, receivers)
+    new_t, new_m = measure(prepared_once, receivers)
+    print(f"수신자 {n:,}명")
+    print(f"  수신자별 MIME 생성 : {base_t:8.3f}s  (최대 메모리 {base_m / 1024:,.0f} KiB)")
+    print(f"  1회 렌더링 재사용  : {new_t:8.3f}s  (최대 메모리 {new_m / 1024:,.0f} KiB)")
+    print(f"  속도 향상          : {base_t / new_t:8.1f}x")
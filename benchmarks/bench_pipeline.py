@@ -0,0 +1,109 @@
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fakes
+import fake_telegram
+
+# ==========================================
+# ⏱️ 모닝 브리핑 파이프라인 전체 오프라인 벤치마크 (구독자 100 / 1만 / 10만명)
+# 실행: python benchmarks/bench_pipeline.py [--sizes 100,10000] [--gemini 0.5 ...] [--save 결과.json] [--baseline 이전결과.json]
+# 외부 서비스는 모두 benchmarks/fakes.py · fake_telegram.py 대역으로 바꾸고, 단계별 시간은 tracing 집계를 씁니다
+# ==========================================
+TELEGRAM_CHATS = 5
+
+
+def setup(args):
+    # 앱 모듈을 import 하기 전에 환경 변수와 대역을 준비합니다
+    fakes.install()
+    server = fake_telegram.start(latency=args.telegram)
+    os.environ.update({
+        "EVE_TRACE_LOG": "0",
+        "API_KEY": "bench", "SENDER_EMAIL": "eve@example.com", "APP_PASSWORD": "bench", "GCP_CREDENTIALS": "{}",
+        "TELEGRAM_API_BASE": server.base_url, "TELEGRAM_BOT_TOKEN": "bench",
+        "TELEGRAM_CHAT_ID": ",".join(str(1000 + i) for i in range(TELEGRAM_CHATS)),
+        "TELEGRAM_PER_CHAT_INTERVAL": "0", "TELEGRAM_MAX_PER_SECOND": "1000",
+        # 실서버 발송 한도 대신 대역의 지연만으로 처리량을 잽니다
+        "SMTP_WORKERS": str(args.workers), "SMTP_MAX_PER_SECOND": "1000000", "SMTP_MAX_PER_DAY": "0",
+    })
+
+
+def run(size, args):
+    import newsletter
+    import resources
+    import storage
+    import tracing
+
+    data_dir = tempfile.mkdtemp(prefix="eve-bench-")
+    storage.DATA_DIR = data_dir
+    resources.get_sheet.cache_clear()
+    tracing.reset()
+    fakes.configure(size, yfinance=args.yfinance, news=args.news, gemini=args.gemini, tts=args.tts,
+                    sheets=args.sheets, smtp_login=args.smtp_login, smtp_send=args.smtp_send)
+    try:
+        started = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            newsletter.job_send_newsletter()
+        elapsed = time.perf_counter() - started
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    stages = tracing.stage_summary()["stages"]
+    return {"subscribers": size, "total_s": round(elapsed, 3), "emails_per_s": round(size / elapsed, 1),
+            "sent": fakes.calls.get("smtp_send", 0), "llm_calls": fakes.calls.get("gemini", 0),
+            "stages_ms": {name: s["total_ms"] for name, s in sorted(stages.items())},
+            "errors": {name: s["errors"] for name, s in stages.items() if s["errors"]}}
+
+
+def report(result):
+    print(f"\n👥 구독자 {result['subscribers']:,}명 — 전체 {result['total_s']:.2f}s, {result['emails_per_s']:,.1f}통/s (발송 {result['sent']:,}통, AI 호출 {result['llm_calls']}회)")
+    for name, ms in result["stages_ms"].items():
+        print(f"  {name:<24} {ms:>10,.1f} ms")
+    if result["errors"]:
+        print(f"  ⚠️ 오류: {result['errors']}")
+
+
+def compare(results, baseline_path, tolerance):
+    # 같은 구독자 수의 이전 결과보다 tolerance 이상 느려지면 회귀로 보고 종료 코드 1
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["subscribers"]: r for r in json.load(f)["results"]}
+    regressed = False
+    for r in results:
+        base = baseline.get(r["subscribers"])
+        if not base:
+            continue
+        ratio = r["total_s"] / base["total_s"]
+        mark = "❌ 회귀" if ratio > 1 + tolerance else "✅"
+        regressed |= ratio > 1 + tolerance
+        print(f"{mark} 구독자 {r['subscribers']:,}명: {base['total_s']:.2f}s → {r['total_s']:.2f}s ({ratio:.2f}x)")
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="모닝 브리핑 파이프라인 오프라인 벤치마크")
+    parser.add_argument("--sizes", default="100,10000,100000", help="구독자 수 (쉼표 구분)")
+    parser.add_argument("--workers", type=int, default=8, help="SMTP 동시 세션 수")
+    for kind, default in {**fakes.LATENCY, "telegram": 0.05}.items():
+        parser.add_argument(f"--{kind.replace('_', '-')}", type=float, default=default, help=f"{kind} 지연(초)")
+    parser.add_argument("--save", help="결과를 JSON 으로 저장")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="회귀로 볼 속도 저하 비율")
+    args = parser.parse_args()
+
+    setup(args)
+    results = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        results.append(run(size, args))
+        report(results[-1])
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"latency": {k: getattr(args, k) for k in [*fakes.LATENCY, "telegram"]}, "workers": args.workers,
+                       "results": results}, f, ensure_ascii=False, indent=2)
+    if args.baseline and compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
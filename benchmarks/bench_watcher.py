@@ -0,0 +1,86 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("EVE_TRACE_LOG", "0")
+import watcher
+
+# ==========================================
+# ⏱️ 시장 급변 감지기 재생 벤치마크 (합성 1분봉 + 알려진 시각의 급변 주입 → 감지 여부 · 틱당 처리 시간)
+# 실행: python benchmarks/bench_watcher.py [--days 20] [--shocks 5] [--csv 재생용.csv]
+# ==========================================
+BASE = {"^VIX": 16.0, "^TNX": 4.2, "KRW=X": 1380.0, "^IXIC": 17000.0, "^KS11": 2600.0}
+# 1분 수익률의 표준편차
+VOLATILITY = {"^VIX": 0.002, "^TNX": 0.0004, "KRW=X": 0.0001, "^IXIC": 0.0005, "^KS11": 0.0005}
+# 주입할 급변 (봉 하나에서 뛰는 비율) — VIX 는 경계선 30 돌파까지
+JUMPS = {"^VIX": 1.0, "^TNX": 0.05, "KRW=X": 0.015, "^IXIC": -0.04, "^KS11": -0.04}
+BARS_PER_DAY = 390
+
+
+def synthetic_feed(days, shocks, seed=7):
+    # 평일 정규장(UTC 13:30~20:00) 1분봉 랜덤워크 + 무작위 날짜·종목·시각에 급변 주입
+    rng = np.random.default_rng(seed)
+    sessions = pd.bdate_range("2024-01-01", periods=days, tz="UTC") + pd.Timedelta(hours=13, minutes=30)
+    index = pd.DatetimeIndex(np.concatenate([s + pd.to_timedelta(np.arange(BARS_PER_DAY), unit="min") for s in sessions]))
+    returns = pd.DataFrame({s: rng.normal(0, VOLATILITY[s], len(index)) for s in BASE}, index=index)
+    injected = []
+    for day, sym in zip(rng.choice(days, shocks, replace=False), rng.choice(list(BASE), shocks)):
+        bar = day * BARS_PER_DAY + int(rng.integers(60, BARS_PER_DAY - 30))
+        returns.iloc[bar, returns.columns.get_loc(sym)] += JUMPS[sym]
+        injected.append((index[bar].timestamp(), sym))
+    # 날마다 기준가에서 다시 출발 (하루 안의 누적만 반영)
+    day_of = np.repeat(np.arange(days), BARS_PER_DAY)
+    growth = np.exp(np.log1p(returns).groupby(day_of).cumsum().to_numpy())
+    return pd.DataFrame(growth * np.array([BASE[s] for s in returns.columns]), index=index, columns=returns.columns), sorted(injected)
+
+
+def _day(ts):
+    return pd.Timestamp(ts, unit="s", tz="UTC").strftime("%Y-%m-%d")
+
+
+def run(closes, injected):
+    fired = []
+    feed = watcher.ReplayFeed(closes)
+    w = watcher.Watcher(feed, watcher.ShockDetector(), lambda signals: fired.extend(signals))
+    started = time.perf_counter()
+    w.run(interval=0)
+    elapsed = time.perf_counter() - started
+
+    # 주입한 급변마다 같은 종목의 첫 신호까지 몇 봉 걸렸는지
+    lags, missed = [], []
+    for ts, sym in injected:
+        hits = [s["ts"] for s in fired if s["symbol"] == sym and 0 <= s["ts"] - ts <= 10 * 60]
+        if hits:
+            lags.append((min(hits) - ts) / 60)
+        else:
+            missed.append((pd.Timestamp(ts, unit="s", tz="UTC"), sym))
+    # 주입한 급변과 같은 날 · 같은 종목에서 이어진 신호가 아니면 오경보
+    false_alarms = [s for s in fired if not any(s["symbol"] == sym and 0 <= s["ts"] - ts and s["at"][:10] == _day(ts) for ts, sym in injected)]
+    return {"ticks": w.ticks, "elapsed_s": elapsed, "us_per_tick": elapsed / max(w.ticks, 1) * 1e6, "signals": len(fired),
+            "detected": len(lags), "injected": len(injected), "lag_bars": lags, "missed": missed, "false_alarms": false_alarms}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="시장 급변 감지기 재생 벤치마크")
+    parser.add_argument("--days", type=int, default=20, help="합성할 거래일 수")
+    parser.add_argument("--shocks", type=int, default=5, help="주입할 급변 횟수")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--csv", help="합성 피드를 저장 (python watcher.py --replay 로 재생)")
+    args = parser.parse_args()
+
+    closes, injected = synthetic_feed(args.days, args.shocks, args.seed)
+    if args.csv:
+        closes.to_csv(args.csv)
+    r = run(closes, injected)
+    print(f"🧪 틱 {r['ticks']:,}개 — {r['elapsed_s']:.3f}s, 틱당 {r['us_per_tick']:.1f}µs")
+    print(f"🚨 주입 {r['injected']}건 중 {r['detected']}건 감지 (감지까지 {r['lag_bars']} 봉), 전체 신호 {r['signals']}건")
+    for ts, sym in r["missed"]:
+        print(f"  ❌ 놓침: {ts} {sym}")
+    for s in r["false_alarms"]:
+        print(f"  ⚠️ 오경보: {s['at']} {s['message']}")
+    if r["missed"]:
+        sys.exit(1)
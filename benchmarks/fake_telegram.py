@@ -0,0 +1,91 @@
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# ==========================================
+# 🧪 로컬 가짜 텔레그램 Bot API (sendMessage 만 흉내)
+# 실행: python benchmarks/fake_telegram.py [포트] [지연ms] [N번째마다 429]
+# 사용: TELEGRAM_API_BASE=http://127.0.0.1:포트 python ... (또는 아래 __main__ 의 발송 데모)
+# ==========================================
+MAX_LENGTH = 4096
+
+
+class FakeTelegram(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.05, throttle_every=0, retry_after=1):
+        super().__init__(("127.0.0.1", port), Handler)
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.counter = itertools.count(1)
+        self.message_ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.messages = []
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+        time.sleep(server.latency)
+        if not self.path.endswith("/sendMessage"):
+            return self.reply(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+        if server.throttle_every and next(server.counter) % server.throttle_every == 0:
+            return self.reply(429, {"ok": False, "error_code": 429, "description": "Too Many Requests: retry later",
+                                    "parameters": {"retry_after": server.retry_after}})
+        text = form.get("text", "")
+        if not text or len(text) > MAX_LENGTH:
+            return self.reply(400, {"ok": False, "error_code": 400, "description": "Bad Request: message is too long"})
+        with server.lock:
+            message_id = next(server.message_ids)
+            server.messages.append((form.get("chat_id"), text))
+        self.reply(200, {"ok": True, "result": {"message_id": message_id, "chat": {"id": form.get("chat_id")}, "text": text}})
+
+
+def start(port=0, latency=0.05, throttle_every=0, retry_after=1):
+    server = FakeTelegram(port, latency, throttle_every, retry_after)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    latency = int(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+    throttle_every = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    server = start(port, latency, throttle_every)
+    os.environ["TELEGRAM_API_BASE"] = server.base_url
+    os.environ.setdefault("TELEGRAM_PER_CHAT_INTERVAL", "0.05")
+    import telegram_bot
+
+    chat_ids = [str(1000 + i) for i in range(100)]
+    text = "🚨 [긴급 속보] 안녕하세요, 이브입니다.<br>" + "<b>시장 영향</b> 분석 문단입니다. &amp; 환율 급등<br>" * 200
+    start_time = time.perf_counter()
+    report = telegram_bot.summarize(telegram_bot.broadcast("TEST", chat_ids, text))
+    elapsed = time.perf_counter() - start_time
+    print(f"가짜 Bot API: {server.base_url} (지연 {server.latency * 1000:.0f}ms, {throttle_every}건마다 429)")
+    print(f"  채팅방 {report['total']}곳 / 성공 {report['sent']} / 실패 {report['failed']}")
+    print(f"  메시지 {len(server.messages)}건 (방당 {len(server.messages) // max(report['sent'], 1)}조각), {elapsed:.2f}s")
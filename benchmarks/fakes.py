@@ -0,0 +1,190 @@
+import asyncio
+import re
+import smtplib
+import sys
+import threading
+import time
+import types
+import pandas as pd
+
+# ==========================================
+# 🧪 오프라인 대역(stand-in) 모음 — yfinance · Gemini · 구글 시트 · edge-tts · SMTP
+# 실제 모듈 대신 sys.modules 에 끼워 넣고, 호출마다 설정한 지연(초)을 흉내 냅니다
+# 텔레그램은 benchmarks/fake_telegram.py 의 로컬 HTTP 서버를 사용합니다
+# ==========================================
+LATENCY = {
+    "yfinance": 0.3,     # yf.download / Ticker.history 1회
+    "news": 0.2,         # Ticker.get_news 1회
+    "gemini": 2.0,       # generate_content 전체 응답
+    "tts": 1.0,          # edge-tts 음성 합성 1회
+    "sheets": 0.3,       # 시트 get / append_rows 1회
+    "smtp_login": 0.2,   # SMTP 접속 + 로그인
+    "smtp_send": 0.005,  # 메일 1통
+}
+SHEET_ROWS = []
+# 시트 C열(관심사) 예시 — 구독자마다 돌아가며 배정
+PREFERENCES = ["", "KOSPI", "환율", "미국 기술주, 금리", "코스피/환율", "나스닥", "", "금리", "환율, KOSPI"]
+AI_TEXT = "안녕하세요! 여러분의 경제 비서 이브입니다.<br>" + "<b>오늘의 시장 날씨</b>는 맑음입니다. 나스닥과 환율 흐름을 짚어 봅니다.<br>" * 40
+PERIOD_DAYS = {"1mo": 22, "3mo": 66, "6mo": 130, "1y": 252, "2y": 504, "5y": 1260, "10y": 2520, "max": 5000}
+
+calls = {}
+_calls_lock = threading.Lock()
+
+
+def _hit(kind, seconds=None):
+    with _calls_lock:
+        calls[kind] = calls.get(kind, 0) + 1
+    time.sleep(LATENCY[kind] if seconds is None else seconds)
+
+
+def configure(subscribers=0, **latency):
+    # configure(10_000, gemini=0.5) — 시트 구독자 수와 단계별 지연을 바꿉니다
+    LATENCY.update(latency)
+    SHEET_ROWS[:] = [[f"user{i}@example.com", "2024-01-01 07:00:00", PREFERENCES[i % len(PREFERENCES)]] for i in range(subscribers)]
+    calls.clear()
+
+
+# ---------- yfinance ----------
+def _prices(symbols, days):
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=max(days, 1))
+    frames = {}
+    for i, sym in enumerate(symbols):
+        close = pd.Series(100.0 + i + (hash(sym) % 50), index=dates) * (1 + 0.001 * pd.Series(range(len(dates)), index=dates))
+        frames[sym] = pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close, "Volume": 1e6})
+    return frames
+
+
+def _days(period=None, start=None):
+    if start is not None:
+        return len(pd.bdate_range(start=pd.Timestamp(start).tz_localize(None), end=pd.Timestamp.today().normalize()))
+    if period and period.endswith("d"):
+        return int(period[:-1])
+    return PERIOD_DAYS.get(period, 22)
+
+
+def download(tickers, period=None, start=None, **kwargs):
+    _hit("yfinance")
+    symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+    return pd.concat(_prices(symbols, _days(period, start)), axis=1).swaplevel(axis=1).sort_index(axis=1)
+
+
+class Ticker:
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, period=None, start=None, **kwargs):
+        _hit("yfinance")
+        return _prices([self.symbol], _days(period, start))[self.symbol]
+
+    def get_news(self, count=10):
+        _hit("news")
+        return [{"title": f"{self.symbol} 관련 뉴스 {i}", "link": f"https://example.com/{self.symbol}/{i}"} for i in range(count)]
+
+    @property
+    def news(self):
+        return self.get_news()
+
+
+# ---------- Gemini ----------
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+        self.parts = [text]
+
+
+class GenerativeModel:
+    def __init__(self, model_name, **kwargs):
+        self.model_name = f"models/{model_name}"
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        if not stream:
+            _hit("gemini")
+            return _Chunk(AI_TEXT)
+        return self._stream()
+
+    def _stream(self):
+        pieces = re.findall(r'.{1,80}', AI_TEXT, re.S)
+        for piece in pieces:
+            _hit("gemini", LATENCY["gemini"] / len(pieces))
+            yield _Chunk(piece)
+
+
+# ---------- 구글 시트 ----------
+class Sheet:
+    def get(self, range_name):
+        _hit("sheets")
+        start = int(re.match(r'A(\d+)', range_name).group(1))
+        return [list(r) for r in SHEET_ROWS[start - 2:]]
+
+    def append_rows(self, rows, **kwargs):
+        _hit("sheets")
+        SHEET_ROWS.extend(rows)
+
+
+class _Client:
+    def open(self, name):
+        return types.SimpleNamespace(sheet1=Sheet())
+
+
+class ServiceAccountCredentials:
+    @staticmethod
+    def from_json_keyfile_dict(creds_dict, scope):
+        return ServiceAccountCredentials()
+
+
+# ---------- edge-tts ----------
+class Communicate:
+    def __init__(self, text, voice, rate=None, **kwargs):
+        self.text = text
+
+    async def save(self, path):
+        with _calls_lock:
+            calls["tts"] = calls.get("tts", 0) + 1
+        await asyncio.sleep(LATENCY["tts"])
+        with open(path, "wb") as f:
+            f.write(b"ID3" + self.text.encode("utf-8")[:1024])
+
+
+# ---------- SMTP ----------
+class SMTP:
+    def __init__(self, host, port=None, timeout=None, **kwargs):
+        self.sent = 0
+
+    def login(self, user, password):
+        _hit("smtp_login")
+
+    def sendmail(self, sender, recipients, message):
+        _hit("smtp_send")
+        self.sent += 1
+        return {}
+
+    def send_message(self, message):
+        return self.sendmail(message["From"], [message["To"]], message.as_bytes())
+
+    def quit(self):
+        pass
+
+    close = quit
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+
+def install():
+    # 앱 모듈을 import 하기 전에 호출해야 합니다
+    _module("yfinance", download=download, Ticker=Ticker)
+    genai = _module("google.generativeai", configure=lambda **kwargs: None, GenerativeModel=GenerativeModel)
+    try:
+        import google
+    except ImportError:
+        google = _module("google")
+    google.generativeai = genai
+    _module("gspread", authorize=lambda creds: _Client())
+    service_account = _module("oauth2client.service_account", ServiceAccountCredentials=ServiceAccountCredentials)
+    _module("oauth2client", service_account=service_account)
+    _module("edge_tts", Communicate=Communicate)
+    smtplib.SMTP_SSL = SMTP
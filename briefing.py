@@ -0,0 +1,202 @@
+import datetime
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from storage import data_path
+
+# ==========================================
+# 📦 모닝 브리핑 아티팩트 (크론 · 대시보드 · 메일 공용 스냅샷)
+# ==========================================
+# 스냅샷 구조가 바뀌면 SCHEMA_VERSION, 프롬프트 문구가 바뀌면 PROMPT_VERSION 을 올립니다
+SCHEMA_VERSION = 1
+PROMPT_VERSION = "briefing-v2"
+# 이 시간(초)보다 오래된 스냅샷은 새로 생성합니다
+BRIEFING_MAX_AGE = int(os.environ.get("BRIEFING_MAX_AGE", "3600"))
+# 보관할 과거 스냅샷 개수
+BRIEFING_KEEP = 30
+REMOTE_CACHE_SECONDS = 60
+# 뉴스 조회가 제한 시간을 넘겼을 때 프롬프트에 넣는 문구
+NEWS_DELAYED = "뉴스 업데이트 지연"
+
+_remote_cache = {}
+# 크론에서 음성·맞춤 브리핑 스레드가 같은 스냅샷을 동시에 저장할 수 있어 저장 순서를 맞춥니다
+_save_lock = threading.Lock()
+
+
+def fetch_news():
+    # 여러 종목 피드에서 지난 브리핑 이후 새로 나온 기사만 골라 프롬프트 분량만큼 (news.py)
+    # 반환: (뉴스 문단, 새 기사 키) — 키는 스냅샷에 담겨 save 때 본 기사로 기록됩니다
+    from news import headlines
+
+    return headlines()
+
+
+def collect_inputs():
+    # 지표 + 뉴스 수집 (AI 분석 전 단계) — 서로 무관하므로 동시에 받습니다
+    from market_data import GLOBAL_TICKERS, get_quotes
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        news_future = executor.submit(fetch_news)
+        quotes = get_quotes(GLOBAL_TICKERS)
+        news_text, news_keys = news_future.result()
+        return {"quotes": quotes, "news_text": news_text, "news_keys": news_keys}
+
+
+def build_prompt(inputs):
+    from market_data import GLOBAL_TICKERS
+    ndx, tnx, vix, krw = (inputs["quotes"][t] for t in GLOBAL_TICKERS)
+    news_text = inputs["news_text"]
+    # 💡 [마크다운 방지 프롬프트 추가!]
+    return f"""
+    너는 사용자의 스마트한 경제 비서이자 전속 아나운서인 '이브(Eve)'야.
+    [데이터] 나스닥:{ndx[0]}({ndx[2]}%), 금리:{tnx[0]}%, VIX:{vix[0]}, 환율:{krw[0]}원
+    [뉴스] {news_text}
+
+    1. 반드시 "안녕하세요! 여러분의 경제 비서 이브입니다." 라고 다정하게 시작해.
+    2. 시장 날씨, KOSPI 예상, 대출 금리 영향을 분석해줘.
+    3. 절대 단정적인 투자 권유는 피하고 중립적인 어조를 써.
+
+    🚨 [매우 중요 규칙]
+    절대로 마크다운 기호(*, #, -, ` 등)를 사용하지 마!
+    글자를 강조하고 싶을 때는 반드시 HTML <b>태그를 쓰고, 줄바꿈은 <br> 태그만 사용해서 아주 깔끔하게 작성해.
+    """
+
+
+def fallback_text(inputs):
+    # AI 분석이 제한 시간 안에 오지 않았을 때 대신 보내는 지표·뉴스 요약본
+    from market_data import GLOBAL_TICKERS
+    ndx, tnx, vix, krw = (inputs["quotes"][t] for t in GLOBAL_TICKERS)
+    news = inputs["news_text"].strip().replace("\n", "<br>")
+    return ("안녕하세요! 여러분의 경제 비서 이브입니다.<br>"
+            "오늘은 AI 분석이 늦어져 주요 지표와 뉴스만 먼저 전해 드립니다.<br><br>"
+            f"<b>나스닥</b> {ndx[0]} ({ndx[2]}%)<br><b>미 10년물 금리</b> {tnx[0]}%<br>"
+            f"<b>VIX</b> {vix[0]}<br><b>원/달러 환율</b> {krw[0]}원<br><br>"
+            f"<b>주요 뉴스</b><br>{news}")
+
+
+def new_artifact(inputs, ai_text, audio_file=None, degraded=False):
+    now = time.time()
+    # ID = 생성 시각(초) + 본문 해시 — 같은 초에 만들어진 두 스냅샷(대시보드 · 크론 동시 생성)이 서로 덮어쓰지 않도록
+    digest = hashlib.sha1(f"{now}|{ai_text}".encode("utf-8")).hexdigest()[:8]
+    return {
+        "schema": SCHEMA_VERSION,
+        "prompt_version": PROMPT_VERSION,
+        "id": f"{datetime.datetime.fromtimestamp(now).strftime('%Y%m%d-%H%M%S')}-{digest}",
+        "created_at": now,
+        "quotes": {t: list(v) for t, v in inputs["quotes"].items()},
+        "news_text": inputs["news_text"],
+        # 이 브리핑에 처음 실린 기사 키 (news.py) — 저장되면 다음 브리핑부터는 새 기사에서 빠집니다
+        "news_keys": inputs.get("news_keys", []),
+        "ai_text": ai_text,
+        "audio_file": audio_file,
+        # 맞춤 브리핑: {프로필 키: AI 분석} — 기본(global) 프로필은 ai_text 를 그대로 씁니다
+        "profiles": {},
+        # fallback_text 로 대신 채운 스냅샷 — 신선도 검사에서 제외해 다음 번에 다시 생성합니다
+        "degraded": degraded,
+    }
+
+
+def is_fresh(artifact, max_age=BRIEFING_MAX_AGE):
+    return bool(artifact) and artifact.get("schema") == SCHEMA_VERSION \
+        and artifact.get("prompt_version") == PROMPT_VERSION \
+        and not artifact.get("degraded") \
+        and time.time() - artifact.get("created_at", 0) < max_age
+
+
+def save(artifact):
+    # 버전별 파일 + latest.json 을 원자적으로 기록합니다
+    with _save_lock:
+        for name in [f"{artifact['id']}.json", "latest.json"]:
+            path = data_path("briefings", name)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(artifact, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+    if artifact.get("news_keys"):
+        try:
+            from news import remember
+            remember(artifact["news_keys"])
+        except Exception as e:
+            print(f"⚠️ 뉴스 기록 실패 (다음 브리핑에 같은 기사가 다시 실릴 수 있음): {e}")
+    history = sorted(p for p in glob.glob(data_path("briefings", "*.json")) if not p.endswith("latest.json"))
+    for old in history[:-BRIEFING_KEEP]:
+        try:
+            os.remove(old)
+        except FileNotFoundError:
+            pass  # 다른 프로세스(대시보드 · 크론)가 먼저 정리함
+    return artifact
+
+
+def _load_local():
+    try:
+        with open(data_path("briefings", "latest.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _load_remote(url):
+    # 크론이 게시한 스냅샷 (예: briefing-data 브랜치의 raw URL) — 짧게 메모리 캐시
+    cached = _remote_cache.get(url)
+    if cached and time.time() - cached[0] < REMOTE_CACHE_SECONDS:
+        return cached[1]
+    try:
+        from resources import get_http_session
+        artifact = get_http_session().get(url, timeout=5).json()
+    except Exception as e:
+        print(f"⚠️ 원격 브리핑 스냅샷 조회 실패: {e}")
+        artifact = None
+    _remote_cache[url] = (time.time(), artifact)
+    return artifact
+
+
+def load_latest(remote_url=None):
+    # 로컬 스냅샷이 신선하면 파일 한 번 읽기로 끝, 아니면 원격 스냅샷과 비교해 더 최신 것을 씁니다
+    local = _load_local()
+    if is_fresh(local) or not remote_url:
+        return local
+    remote = _load_remote(remote_url)
+    if remote and remote.get("created_at", 0) > (local or {}).get("created_at", 0):
+        return save(remote)
+    return local
+
+
+def personalize(model, artifact, keys):
+    # 구독자 프로필 중 스냅샷에 아직 없는 것만 프로필당 1회 생성해 붙입니다 (AI 호출 수 = 프로필 종류 수)
+    import profiles
+    from market_data import get_quotes
+
+    done = artifact.get("profiles", {})
+    missing = [k for k in dict.fromkeys(keys) if k != profiles.DEFAULT_PROFILE and k not in done]
+    if not missing or artifact.get("degraded"):
+        return artifact
+    quotes = {t: tuple(v) for t, v in artifact["quotes"].items()}
+    extra = [t for t in profiles.profile_tickers(missing) if t not in quotes]
+    if extra:
+        try:
+            quotes.update(get_quotes(extra))
+        except Exception as e:
+            print(f"⚠️ 관심 지표 조회 실패 (기본 지표로 생성): {e}")
+    base_prompt = build_prompt({"quotes": quotes, "news_text": artifact["news_text"]})
+    generated = profiles.generate_all(model, base_prompt, missing, quotes, version=PROMPT_VERSION)
+    # 통째로 바꿔 끼워 다른 스레드의 save 와 충돌하지 않게 합니다
+    artifact["quotes"] = {t: list(v) for t, v in quotes.items()}
+    artifact["profiles"] = {**done, **generated}
+    print(f"🎯 맞춤 브리핑 {len(generated)}/{len(missing)}종 생성: {', '.join(generated) or '-'}")
+    return save(artifact)
+
+
+def attach_audio(artifact):
+    # 크론용: 본문이 확정된 스냅샷에 음성 파일을 붙여 다시 저장 (메일 발송과 동시에 진행)
+    import tts
+
+    try:
+        artifact["audio_file"] = os.path.basename(tts.synthesize(tts.clean_script(artifact["ai_text"])))
+        print(f"🎧 음성 브리핑 준비 완료: {artifact['audio_file']}")
+    except Exception as e:
+        print(f"⚠️ 음성 브리핑 생성 실패: {e}")
+    return save(artifact)
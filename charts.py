@@ -0,0 +1,109 @@
+import collections
+import threading
+import time
+import numpy as np
+from analytics import recent
+from price_store import REFRESH_TTL, get_history
+from tracing import incr
+
+# ==========================================
+# 📉 차트 다운샘플링 (긴 기간도 시리즈당 CHART_POINTS 개 이하만 브라우저로 — 모양·극값은 보존)
+# ==========================================
+# 기간 선택지 (화면 표시 → price_store 기간)
+CHART_PERIODS = {"1개월": "1mo", "3개월": "3mo", "1년": "1y", "5년": "5y", "전체": "max"}
+# 시리즈당 최대 점 수 — 차트 폭(픽셀)보다 많이 보내도 화면에는 차이가 없습니다
+CHART_POINTS = 500
+CACHE_SIZE = 128
+
+_history_cache = collections.OrderedDict()
+_frame_cache = collections.OrderedDict()
+_lock = threading.Lock()
+
+
+def lttb(values, points):
+    # Largest-Triangle-Three-Buckets: 구간마다 앞 점 · 다음 구간 평균과 만드는 삼각형이 가장 큰 점 하나를 고릅니다
+    # 반환: 남길 행 위치 (처음·마지막 점 포함, 가로축은 봉 순서)
+    size = len(values)
+    if points >= size or points < 3:
+        return np.arange(size)
+    y = np.asarray(values, dtype=float)
+    edges = np.linspace(1, size - 1, points - 1).astype(int)
+    keep = np.empty(points, dtype=int)
+    keep[0], keep[-1] = 0, size - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (size - 1, size)
+        avg_x, avg_y = (nlo + nhi - 1) / 2, y[nlo:nhi].mean()
+        xs = np.arange(lo, hi)
+        area = np.abs((a - avg_x) * (y[lo:hi] - y[a]) - (a - xs) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def minmax(values, points):
+    # 여러 시리즈 공용 행 선택: 구간마다 각 열의 최솟값·최댓값 행을 남깁니다 (한 번의 reshape 로 전 열 동시 계산)
+    values = np.asarray(values, dtype=float).reshape(len(values), -1)
+    rows, cols = values.shape
+    buckets = max(1, (points - 2) // (2 * cols))
+    if rows <= points or rows <= buckets:
+        return np.arange(rows)
+    width = -(-rows // buckets)
+    padded = np.full((buckets * width, cols), np.nan)
+    padded[:rows] = values
+    blocks = padded.reshape(buckets, width, cols)
+    offsets = (np.arange(buckets) * width)[:, None]
+    low = np.where(np.isnan(blocks), np.inf, blocks).argmin(axis=1) + offsets
+    high = np.where(np.isnan(blocks), -np.inf, blocks).argmax(axis=1) + offsets
+    keep = np.unique(np.concatenate([low.ravel(), high.ravel(), [0, rows - 1]]))
+    return keep[keep < rows]
+
+
+def downsample(data, points=CHART_POINTS, method="lttb"):
+    # lttb: 첫 열(주 시리즈) 모양 기준으로 행을 골라 모든 열에 적용 / minmax: 모든 열의 극값 보존
+    if len(data) <= points:
+        return data
+    values = data.to_numpy(dtype=float)
+    if method == "lttb":
+        primary = values if values.ndim == 1 else values[:, 0]
+        valid = np.flatnonzero(~np.isnan(primary))
+        keep = valid[lttb(primary[valid], points)]
+    else:
+        keep = minmax(values, points)
+    return data.iloc[keep]
+
+
+def _remember(cache, key, value):
+    with _lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > CACHE_SIZE:
+            cache.popitem(last=False)
+
+
+def history_chart(symbol, period="1y", points=CHART_POINTS):
+    # (종목, 기간, 해상도)별 다운샘플 종가 — 가격 저장소 갱신 주기(REFRESH_TTL) 동안은 저장소도 읽지 않습니다
+    key = (symbol, period, points)
+    with _lock:
+        hit = _history_cache.get(key)
+    if hit and hit[0] > time.time():
+        incr("charts.cache_hit")
+        return hit[1]
+    series = downsample(get_history(symbol, period)["Close"].dropna(), points)
+    _remember(_history_cache, key, (time.time() + REFRESH_TTL, series))
+    return series
+
+
+def indicator_chart(frame, columns, labels, period="1y", points=CHART_POINTS, method="minmax"):
+    # analytics 지표 표에서 고른 열의 최근 구간을 다운샘플 — 같은 지표 표(객체)면 캐시된 결과를 그대로 씁니다
+    key = (tuple(columns), tuple(labels), period, points, method)
+    with _lock:
+        hit = _frame_cache.get(key)
+    if hit and hit[0] is frame:
+        incr("charts.cache_hit")
+        return hit[1]
+    data = recent(frame, period)[list(columns)].set_axis(list(labels), axis=1)
+    result = downsample(data, points, method)
+    _remember(_frame_cache, key, (frame, result))
+    return result
@@ -0,0 +1,134 @@
+import datetime
+import glob
+import hashlib
+import json
+import os
+import threading
+from storage import connect
+from subscribers import normalize_email
+
+# ==========================================
+# 🧾 발송 원장 (브리핑 ID × 수신자 단위 발송 기록 · 샤드 분할 · 재실행 이어받기)
+# ==========================================
+DB_NAME = "deliveries.db"
+# 이만큼 모일 때마다 원장에 기록 — 도중에 죽으면 마지막 기록 이후 건만 다시 보냅니다
+FLUSH_EVERY = 200
+# 원장 보관 기간(일)
+LEDGER_KEEP_DAYS = 14
+
+
+def _init(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS deliveries (
+        briefing_id TEXT NOT NULL, channel TEXT NOT NULL, recipient TEXT NOT NULL,
+        status TEXT NOT NULL, attempts INTEGER, error TEXT, shard INTEGER, updated_at TEXT,
+        PRIMARY KEY (briefing_id, channel, recipient))""")
+
+
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def shard_of(recipient, shards):
+    # 해시 기반이라 구독자가 늘거나 줄어도 기존 수신자의 샤드는 바뀌지 않습니다
+    if shards <= 1:
+        return 0
+    return int(hashlib.sha1(normalize_email(recipient).encode("utf-8")).hexdigest()[:8], 16) % shards
+
+
+def select_shard(recipients, shard, shards):
+    return [r for r in recipients if shard_of(r, shards) == shard]
+
+
+def pending(briefing_id, channel, recipients):
+    # 같은 브리핑을 이미 성공적으로 받은 수신자는 뺍니다 (재실행 시 중복 발송 방지)
+    with connect(DB_NAME) as conn:
+        _init(conn)
+        sent = {r[0] for r in conn.execute(
+            "SELECT recipient FROM deliveries WHERE briefing_id = ? AND channel = ? AND status = 'sent'", (briefing_id, channel))}
+    return [r for r in recipients if normalize_email(r) not in sent]
+
+
+class Recorder:
+    # 발송 결과를 모았다가 FLUSH_EVERY 건마다 한 번의 트랜잭션으로 기록합니다 (여러 워커 스레드에서 호출)
+    def __init__(self, briefing_id, channel, shard=0):
+        self.briefing_id = briefing_id
+        self.channel = channel
+        self.shard = shard
+        self.buffer = []
+        self.lock = threading.Lock()
+
+    def add(self, recipient, ok, attempts=1, error=None):
+        row = (self.briefing_id, self.channel, normalize_email(recipient), "sent" if ok else "failed", attempts, error, self.shard, _now())
+        with self.lock:
+            self.buffer.append(row)
+            if len(self.buffer) < FLUSH_EVERY:
+                return
+            rows, self.buffer = self.buffer, []
+        self._write(rows)
+
+    def flush(self):
+        with self.lock:
+            rows, self.buffer = self.buffer, []
+        if rows:
+            self._write(rows)
+
+    def _write(self, rows):
+        # 이미 'sent' 인 기록은 실패로 덮어쓰지 않습니다
+        with connect(DB_NAME) as conn:
+            _init(conn)
+            conn.executemany("""INSERT INTO deliveries VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (briefing_id, channel, recipient) DO UPDATE SET
+                    status = excluded.status, attempts = deliveries.attempts + excluded.attempts,
+                    error = excluded.error, shard = excluded.shard, updated_at = excluded.updated_at
+                WHERE deliveries.status != 'sent'""", rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+
+def report(briefing_id, shard=0, shards=1, **extra):
+    # 이 샤드에서 지금까지 원장에 쌓인 결과 (이번 실행 + 이전 실행분 포함)
+    with connect(DB_NAME) as conn:
+        _init(conn)
+        rows = conn.execute("SELECT channel, status, COUNT(*) FROM deliveries WHERE briefing_id = ? AND shard = ? GROUP BY channel, status",
+                            (briefing_id, shard)).fetchall()
+        failures = conn.execute("SELECT channel, recipient, error FROM deliveries WHERE briefing_id = ? AND shard = ? AND status = 'failed' LIMIT 100",
+                                (briefing_id, shard)).fetchall()
+    counts = {}
+    for channel, status, n in rows:
+        counts.setdefault(channel, {"sent": 0, "failed": 0})[status] = n
+    return {"briefing_id": briefing_id, "shard": shard, "shards": shards, "counts": counts,
+            "failures": [{"channel": c, "recipient": r, "error": e} for c, r, e in failures], "at": _now(), **extra}
+
+
+def merge_reports(reports):
+    # 샤드별 보고서를 하나로 합치고, 보고서가 없는 샤드를 표시합니다
+    merged = {"briefing_ids": sorted({r["briefing_id"] for r in reports}), "counts": {}, "skipped": 0, "failures": [], "missing_shards": []}
+    for r in reports:
+        for channel, counts in r["counts"].items():
+            total = merged["counts"].setdefault(channel, {"sent": 0, "failed": 0})
+            for status, n in counts.items():
+                total[status] = total.get(status, 0) + n
+        merged["skipped"] += r.get("skipped", 0)
+        merged["failures"] += r["failures"]
+    shards = max((r["shards"] for r in reports), default=0)
+    merged["missing_shards"] = sorted(set(range(shards)) - {r["shard"] for r in reports})
+    return merged
+
+
+def load_reports(directory):
+    reports = []
+    for path in sorted(glob.glob(os.path.join(directory, "**", "*.json"), recursive=True)):
+        with open(path, encoding="utf-8") as f:
+            reports.append(json.load(f))
+    return reports
+
+
+def prune(days=LEDGER_KEEP_DAYS):
+    since = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    with connect(DB_NAME) as conn:
+        _init(conn)
+        conn.execute("DELETE FROM deliveries WHERE updated_at < ?", (since,))
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import Future
+from storage import connect
+from tracing import incr, stage
+
+# ==========================================
+# 🧠 Gemini 응답 캐시 (내용 해시 키 + 동시 요청 병합)
+# 캐시는 실행되는 호스트의 DATA_DIR 안에만 있습니다 — 깃허브 러너(크론)와 Streamlit 서버(대시보드)는 각자 따로 가지며,
+# 호스트 사이에 공유되는 것은 이 캐시가 아니라 크론이 게시하는 브리핑 스냅샷(briefing.py, latest.json)입니다
+# ==========================================
+DB_NAME = "llm_cache.db"
+# 같은 프롬프트는 이 시간(초) 동안 API 를 다시 부르지 않습니다
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", "3600"))
+# 캐시 전체 크기 한도 — 넘으면 오래 안 쓴 응답부터 지웁니다
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(20 * 1024 * 1024)))
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _init(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+        key TEXT PRIMARY KEY, model TEXT, version TEXT, text TEXT,
+        size INTEGER, created REAL, last_access REAL)""")
+
+
+def cache_key(model_name, version, prompt):
+    # 모델 이름 + 프롬프트 템플릿 버전 + 데이터가 채워진 프롬프트 전체를 해시합니다
+    return hashlib.sha256("\x1f".join([model_name, version, prompt]).encode("utf-8")).hexdigest()
+
+
+def lookup(key, ttl=LLM_CACHE_TTL):
+    with connect(DB_NAME) as conn:
+        _init(conn)
+        row = conn.execute("SELECT text, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if not row or time.time() - row[1] > ttl:
+            return None
+        conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+    return row[0]
+
+
+def store(key, model_name, version, text):
+    now = time.time()
+    with connect(DB_NAME) as conn:
+        _init(conn)
+        conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     (key, model_name, version, text, len(text.encode("utf-8")), now, now))
+        _evict(conn, now)
+
+
+def _evict(conn, now):
+    conn.execute("DELETE FROM responses WHERE created < ?", (now - LLM_CACHE_TTL,))
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    if total <= LLM_CACHE_MAX_BYTES:
+        return
+    for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+        conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        total -= size
+        if total <= LLM_CACHE_MAX_BYTES:
+            break
+
+
+def _join_or_lead(key):
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future, False
+        future = _inflight[key] = Future()
+        return future, True
+
+
+def _settle(key, future, text=None, error=None):
+    # 대기 중인 요청이 깨어나기 전에 진행 표시부터 지워, 실패 시 재시도가 새 요청으로 시작되게 합니다
+    with _inflight_lock:
+        _inflight.pop(key, None)
+    if error is None:
+        future.set_result(text)
+    else:
+        future.set_exception(error)
+
+
+def generate_text(model, prompt, version="v1", ttl=LLM_CACHE_TTL):
+    # model.generate_content(prompt).text 대체: 캐시 적중 시 즉시 반환, 같은 요청이 진행 중이면 그 결과를 기다립니다
+    key = cache_key(model.model_name, version, prompt)
+    cached = lookup(key, ttl)
+    if cached is not None:
+        incr("llm_cache.hit")
+        return cached
+
+    future, leader = _join_or_lead(key)
+    if not leader:
+        incr("llm_cache.joined")
+        return future.result()
+
+    try:
+        # 앞선 요청이 방금 끝나 캐시에 저장했을 수 있으므로 한 번 더 확인
+        text = lookup(key, ttl)
+        if text is None:
+            with stage("gemini.generate", version=version, prompt_chars=len(prompt)):
+                text = model.generate_content(prompt).text
+            store(key, model.model_name, version, text)
+    except Exception as e:
+        _settle(key, future, error=e)
+        raise
+    _settle(key, future, text)
+    return text
+
+
+def stream_text(model, prompt, version="v1", ttl=LLM_CACHE_TTL):
+    # Gemini 스트리밍 API 로 조각(chunk)을 받는 대로 내보내고, 끝나면 전체 응답을 캐시에 저장합니다
+    key = cache_key(model.model_name, version, prompt)
+    cached = lookup(key, ttl)
+    if cached is not None:
+        incr("llm_cache.hit")
+        yield cached
+        return
+
+    future, leader = _join_or_lead(key)
+    if not leader:
+        try:
+            yield future.result()
+        except Exception:
+            # 앞선 스트림이 중단·실패했다면 직접 다시 생성
+            yield generate_text(model, prompt, version, ttl)
+        return
+
+    text, settled = "", False
+    try:
+        with stage("gemini.stream", version=version, prompt_chars=len(prompt)):
+            for chunk in model.generate_content(prompt, stream=True):
+                piece = chunk.text if chunk.parts else ""
+                text += piece
+                yield piece
+        store(key, model.model_name, version, text)
+        _settle(key, future, text)
+        settled = True
+    except Exception as e:
+        _settle(key, future, error=e)
+        settled = True
+        raise
+    finally:
+        # 화면 이동 등으로 스트림이 도중에 닫힌 경우
+        if not settled:
+            _settle(key, future, error=RuntimeError("응답 스트리밍이 중단되었습니다"))
@@ -0,0 +1,51 @@
+import html
+import re
+from email import policy
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+# ==========================================
+# ✉️ 메일 템플릿 & 1회 렌더링 메시지
+# ==========================================
+
+
+def render_briefing_html(ai_text):
+    return f"""
+    <html>
+      <body style="font-family: Arial, sans-serif; line-height:1.6;">
+        <h2 style="color: #2e6c80;">📈 오늘의 거시경제 시황</h2>
+        <p>{ai_text}</p>
+        <hr>
+        <p style="color:gray; font-size:12px;"><i>이브(Eve) 무인 서버가 아침 7시에 자동으로 발송한 메일입니다.</i></p>
+      </body>
+    </html>
+    """
+
+
+def render_alert_html(ai_text):
+    return f"<html><body>{ai_text}<hr><p style='color:gray; font-size:12px;'><i>[면책 조항] 본 긴급 속보는 투자 참고용이며 법적 증빙으로 사용될 수 없습니다.</i></p></body></html>"
+
+
+def html_to_text(html_content):
+    # text/plain 대체 본문: <br>·문단은 줄바꿈으로, 나머지 태그는 제거
+    text = re.sub(r'(?i)<br\s*/?>|</p>|</h\d>|<hr\s*/?>', '\n', html_content)
+    text = html.unescape(re.sub(r'<[^>]+>', '', text))
+    return re.sub(r'\n\s*\n+', '\n\n', "\n".join(line.strip() for line in text.splitlines())).strip()
+
+
+class PreparedMessage:
+    # 본문(HTML + text/plain)은 한 번만 렌더링·인코딩하고, 수신자별로는 To 등 헤더만 붙입니다
+    def __init__(self, subject, sender_email, html_content, text_content=None):
+        msg = MIMEMultipart('alternative', policy=policy.SMTP)
+        msg['Subject'] = subject
+        msg['From'] = sender_email
+        msg.attach(MIMEText(text_content or html_to_text(html_content), 'plain', 'utf-8', policy=policy.SMTP))
+        msg.attach(MIMEText(html_content, 'html', 'utf-8', policy=policy.SMTP))
+        self.sender_email = sender_email
+        self.payload = msg.as_bytes()
+
+    def for_recipient(self, receiver, headers=None):
+        # 수신자별 헤더(To, 추후 수신거부 링크·추적 토큰)만 새로 직렬화해 공통 바이트 앞에 붙입니다
+        fields = {"To": receiver, **(headers or {})}
+        prefix = "".join(policy.SMTP.fold(name, value) for name, value in fields.items())
+        return prefix.encode("utf-8") + self.payload
@@ -0,0 +1,248 @@
+import datetime
+import os
+import random
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ratelimit import TokenBucket
+from storage import connect
+from tracing import stage
+
+# ==========================================
+# 📮 병렬 SMTP 대량 발송 엔진
+# ==========================================
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "465"))
+# 동시 SMTP 세션 수 / 초당 발송 한도 / 하루 발송 한도 (Gmail 기본 한도에 맞춘 값)
+# ⚠️ 하루 한도는 계정 전체 합계가 아닙니다 — 발송 수를 실행 환경의 로컬 mail_budget.db 에만 세므로
+# 크론에서는 그 실행(샤드)의 발송만 막고, 워처 알림 · 관리자 발송은 따로 셉니다 (Gmail 한도보다 여유 있게 잡으세요)
+SMTP_WORKERS = int(os.environ.get("SMTP_WORKERS", "4"))
+SMTP_MAX_PER_SECOND = float(os.environ.get("SMTP_MAX_PER_SECOND", "5"))
+SMTP_MAX_PER_DAY = int(os.environ.get("SMTP_MAX_PER_DAY", "2000"))
+SMTP_MAX_RETRIES = 3
+# 워커들을 통틀어 SMTP 접속(로그인 포함)이 연속으로 이만큼 실패하면 남은 수신자에게는 시도하지 않고 멈춥니다
+SMTP_MAX_CONNECT_FAILURES = 3
+DB_NAME = "mail_budget.db"
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class RateLimiter(TokenBucket):
+    # 초당 한도는 토큰 버킷, 하루 한도는 날짜별 누적 발송 수(로컬 DB 보관)로 지킵니다
+    # 하루 한도에는 성공한 발송만 셉니다 — 발송 중인 자리(pending)는 한도 검사에만 포함
+    # shards: 같은 크론 실행에서 동시에 발송하는 작업(워크플로 샤드) 수 — 한도를 나눠 가져 이 실행의 합계가 한도를 넘지 않게
+    # (샤드마다 자기 mail_budget.db 에 세므로 이 실행 밖의 발송 — 워처 알림 · 관리자 발송 — 은 포함되지 않습니다)
+    def __init__(self, per_second=SMTP_MAX_PER_SECOND, per_day=SMTP_MAX_PER_DAY, shards=1):
+        super().__init__(per_second / shards)
+        self.per_day = max(1, per_day // shards) if per_day else 0
+        self.day = datetime.date.today().isoformat()
+        with connect(DB_NAME) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS budget (day TEXT PRIMARY KEY, sent INTEGER)")
+            row = conn.execute("SELECT sent FROM budget WHERE day = ?", (self.day,)).fetchone()
+        self.sent_today = row[0] if row else 0
+        self.pending = 0
+        self.unsaved = 0
+
+    def _check(self):
+        if self.per_day and self.sent_today + self.pending >= self.per_day:
+            raise BudgetExceeded(f"하루 발송 한도({self.per_day}통) 초과")
+
+    def _consumed(self):
+        self.pending += 1
+
+    def release(self, sent):
+        with self.lock:
+            self.pending -= 1
+            if sent:
+                self.sent_today += 1
+                self.unsaved += 1
+
+    def save(self):
+        # 덮어쓰지 않고 이번에 보낸 만큼만 더합니다 (같은 날 다른 발송 프로세스의 기록 보존)
+        with self.lock:
+            sent, self.unsaved = self.unsaved, 0
+        with connect(DB_NAME) as conn:
+            conn.execute("INSERT INTO budget VALUES (?, ?) ON CONFLICT(day) DO UPDATE SET sent = sent + excluded.sent", (self.day, sent))
+            self.sent_today = conn.execute("SELECT sent FROM budget WHERE day = ?", (self.day,)).fetchone()[0]
+
+
+class CircuitBreaker:
+    # 수신자가 아니라 계정 · 서버 문제(로그인 거부, 서버 접속 불가)면 수신자마다 로그인 · 재시도를 되풀이하지 않고 발송을 멈춥니다
+    # (잘못된 앱 비밀번호로 구독자 수만큼 로그인을 시도하면 Gmail 계정이 잠길 수 있음)
+    def __init__(self, max_connect_failures=SMTP_MAX_CONNECT_FAILURES):
+        self.max_connect_failures = max_connect_failures
+        self.failures = 0
+        self.reason = None
+        self.lock = threading.Lock()
+
+    def connected(self):
+        with self.lock:
+            self.failures = 0
+
+    def connect_failed(self, error):
+        with self.lock:
+            self.failures += 1
+            if isinstance(error, smtplib.SMTPAuthenticationError):
+                self.reason = f"SMTP 로그인 거부: {error}"
+            elif self.failures >= self.max_connect_failures:
+                self.reason = f"SMTP 서버 접속 {self.failures}회 연속 실패: {error}"
+
+
+def _is_connection_error(error):
+    # smtplib 예외도 OSError 를 상속하므로, 순수 소켓 오류와 연결 끊김만 골라냅니다
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+def _is_temporary(error):
+    # 4xx 응답과 끊긴 연결은 재시도, 5xx 는 영구 실패로 봅니다
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return _is_connection_error(error)
+
+
+class SMTPPool:
+    # 워커 스레드마다 로그인된 SMTP 세션을 하나씩 유지하고, 끊기면 다시 연결합니다
+    def __init__(self, sender_email, app_password, host=SMTP_HOST, port=SMTP_PORT):
+        self.sender_email = sender_email
+        self.app_password = app_password
+        self.host, self.port = host, port
+        self.local = threading.local()
+        self.sessions = []
+        # warm() 으로 미리 열어 두고 아직 어느 워커도 가져가지 않은 세션
+        self.idle = []
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        with stage("smtp.login", host=self.host):
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=30)
+            server.login(self.sender_email, self.app_password)
+        return server
+
+    def warm(self, count):
+        # 본문이 준비되기 전에 세션을 미리 열어 두어 로그인 시간을 AI 생성 시간과 겹칩니다
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            futures = [executor.submit(self._connect) for _ in range(count)]
+        servers = [f.result() for f in futures if f.exception() is None]
+        with self.lock:
+            if not self.closed:
+                self.idle.extend(servers)
+                self.sessions.extend(servers)
+                return len(servers)
+        for server in servers:
+            try:
+                server.quit()
+            except Exception:
+                pass
+        return 0
+
+    def session(self):
+        server = getattr(self.local, "server", None)
+        if server is None:
+            with self.lock:
+                server = self.idle.pop() if self.idle else None
+            if server is None:
+                server = self._connect()
+                with self.lock:
+                    self.sessions.append(server)
+            self.local.server = server
+        return server
+
+    def discard(self):
+        server = getattr(self.local, "server", None)
+        self.local.server = None
+        if server is not None:
+            with self.lock:
+                if server in self.sessions:
+                    self.sessions.remove(server)
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def close(self):
+        with self.lock:
+            sessions, self.sessions, self.idle, self.closed = self.sessions, [], [], True
+        for server in sessions:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
+
+def send_bulk(sender_email, app_password, recipients, build_message, workers=SMTP_WORKERS, limiter=None, max_retries=SMTP_MAX_RETRIES, pool=None, on_result=None):
+    # build_message(receiver) 로 만든 메일(Message 또는 bytes)을 여러 세션에서 동시에 발송하고 수신자별 결과를 돌려줍니다
+    # pool 을 넘기면 미리 로그인해 둔 세션(SMTPPool.warm)을 그대로 씁니다 — 발송이 끝나면 닫힙니다
+    # on_result(result) 는 수신자 한 명의 발송이 끝날 때마다 (워커 스레드에서) 호출됩니다 — 발송 원장 기록용
+    # 로그인 거부 · 연속 접속 실패로 멈추면 남은 수신자는 attempts=0 (시도하지 않음) 으로 돌려줍니다
+    pool = pool or SMTPPool(sender_email, app_password)
+    limiter = limiter or RateLimiter()
+    breaker = CircuitBreaker()
+
+    def deliver(receiver):
+        result = attempt_delivery(receiver)
+        if on_result:
+            on_result(result)
+        return result
+
+    def attempt_delivery(receiver):
+        result = {"recipient": receiver, "ok": False, "attempts": 0, "error": None}
+        for attempt in range(1, max_retries + 2):
+            if breaker.reason:
+                result["error"] = f"발송 중단 — {breaker.reason}"
+                return result
+            result["attempts"] = attempt
+            try:
+                limiter.acquire()
+                try:
+                    server = pool.session()
+                except Exception as e:
+                    breaker.connect_failed(e)
+                    raise
+                breaker.connected()
+                message = build_message(receiver)
+                if isinstance(message, bytes):
+                    # PreparedMessage 처럼 미리 직렬화된 메일은 그대로 전송
+                    server.sendmail(sender_email, [receiver], message)
+                else:
+                    server.send_message(message)
+                limiter.release(sent=True)
+                result["ok"], result["error"] = True, None
+                return result
+            except BudgetExceeded as e:
+                result["error"] = str(e)
+                return result
+            except Exception as e:
+                limiter.release(sent=False)
+                result["error"] = str(e)
+                if _is_connection_error(e):
+                    pool.discard()
+                if breaker.reason or not _is_temporary(e) or attempt > max_retries:
+                    return result
+                time.sleep(min(30, 2 ** attempt) + random.random())
+        return result
+
+    with stage("smtp.send_bulk", recipients=len(recipients), workers=workers) as span:
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(recipients)))) as executor:
+                results = list(executor.map(deliver, recipients))
+        finally:
+            pool.close()
+            limiter.save()
+        span["sent"] = sum(r["ok"] for r in results)
+    return results
+
+
+def summarize(results):
+    # not_attempted: 발송 중단(로그인 거부 등)으로 한 번도 시도하지 않은 수신자 수 (failed 에 포함)
+    sent = sum(r["ok"] for r in results)
+    return {"total": len(results), "sent": sent, "failed": len(results) - sent,
+            "not_attempted": sum(r["attempts"] == 0 for r in results),
+            "failures": {r["recipient"]: r["error"] for r in results if not r["ok"]}}
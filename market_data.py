@@ -0,0 +1,37 @@
+import pandas as pd
+import price_store
+
+# ==========================================
+# 📊 공용 시장 데이터 레이어 (app.py / newsletter.py 공용)
+# ==========================================
+# 글로벌 브리핑 4대 지표: 나스닥, 미 10년물 금리, VIX, 원/달러 환율
+GLOBAL_TICKERS = ["^IXIC", "^TNX", "^VIX", "KRW=X"]
+# K-Macro 지표: KOSPI, KOSDAQ, 원/달러 환율
+KOREA_TICKERS = ["^KS11", "^KQ11", "KRW=X"]
+
+
+def download_closes(tickers, period="5d"):
+    # 로컬 가격 저장소를 증분 동기화한 뒤(새 봉만 일괄 요청) 종가 표를 돌려줍니다
+    return price_store.get_closes(tickers, period)
+
+
+def stored_closes(tickers, period="5d"):
+    # 네트워크 없이 로컬 저장소에 있는 종가만 읽습니다 (시세 조회가 늦어질 때의 대체값)
+    return pd.DataFrame({t: price_store.load(t, period)['Close'] for t in dict.fromkeys(tickers)})
+
+
+def compute_changes(closes):
+    # 종목마다 거래일이 달라 NaN이 섞여 있으므로, 종목별 마지막 유효 종가 2개를 벡터 연산으로 뽑습니다
+    long = closes.melt(var_name="ticker", value_name="close").dropna()
+    last_two = long.groupby("ticker", sort=False).tail(2).groupby("ticker", sort=False)['close']
+    current, previous = last_two.last().round(2), last_two.first().round(2)
+    delta = (current - previous).round(2)
+    pct = ((current - previous) / previous * 100).round(2)
+    table = pd.DataFrame({"current": current, "delta": delta, "pct": pct})
+    return table.reindex(closes.columns)
+
+
+def get_quotes(tickers, period="5d", refresh=True):
+    # 반환 형식: {티커: (현재가, 전일 대비, 등락률%)}
+    table = compute_changes(download_closes(tickers, period) if refresh else stored_closes(tickers, period))
+    return {t: (float(r.current), float(r.delta), float(r.pct)) for t, r in table.iterrows()}
@@ -0,0 +1,187 @@
+import datetime
+import hashlib
+import math
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from storage import connect
+from tracing import incr, stage
+
+# ==========================================
+# 📰 뉴스 수집 (여러 종목 피드 동시 조회 → 같은 기사 합치기 → 이미 본 기사 제외 → 최신성·관련도 순으로 프롬프트 분량만큼)
+# ==========================================
+NEWS_TICKERS = ["SPY", "QQQ", "^KS11", "KRW=X"]
+NEWS_PER_TICKER = 10
+DB_NAME = "news.db"
+# 프롬프트에 넣을 최대 기사 수와 제목 글자 수 합계
+NEWS_LIMIT = 8
+NEWS_CHAR_BUDGET = 900
+# 새 기사가 이보다 적으면 아직 피드에 남아 있는 지난 기사로 채웁니다 (조용한 날에도 맥락 유지)
+NEWS_MIN_ITEMS = 3
+# 최신성 반감기(시간) — 12시간 지난 기사는 점수가 절반
+NEWS_HALF_LIFE_HOURS = 12
+# 본 기사 기록 보관 기간(일)
+NEWS_KEEP_DAYS = 7
+# 제목에 있으면 관련도 가중치를 더하는 거시경제 키워드
+KEYWORDS = {
+    "fed": 3, "fomc": 3, "powell": 3, "inflation": 3, "cpi": 3, "korea": 3, "kospi": 3,
+    "rate": 2, "rates": 2, "pce": 2, "jobs": 2, "payrolls": 2, "treasury": 2, "yield": 2, "yields": 2, "bond": 2,
+    "dollar": 2, "won": 2, "tariff": 2, "tariffs": 2, "recession": 2, "samsung": 2, "hynix": 2,
+    "nasdaq": 1, "s&p": 1, "earnings": 1, "nvidia": 1, "oil": 1, "china": 1, "stocks": 1,
+    "금리": 3, "환율": 3, "코스피": 3, "연준": 3, "한국은행": 3, "물가": 2, "달러": 2, "관세": 2,
+}
+NEWS_FAILED = "현재 서버 통신 문제로 뉴스를 불러오지 못했습니다."
+NEWS_EMPTY = "오늘 장에 큰 영향을 미칠만한 특별한 거시경제 뉴스가 없습니다."
+
+
+def _init(conn):
+    # key: "id:<uuid>" / "link:<정규화 주소>" / "title:<정규화 제목 해시>" — 셋 중 하나만 겹쳐도 본 기사
+    conn.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, first_seen REAL)")
+
+
+def normalize_title(title):
+    # 대소문자 · 문장부호 · 공백 차이와 " - 언론사" 꼬리표를 지워 같은 제목이면 같은 문자열로
+    title = re.sub(r'\s+[-|–—]\s+[^-|–—]{2,40}$', '', title.strip())
+    return " ".join(re.sub(r'[^\w\s&]', ' ', title.lower()).split())
+
+
+def normalize_link(link):
+    parts = urlsplit(link.strip())
+    return f"{parts.netloc.lower()}{parts.path.rstrip('/')}" if parts.netloc else ""
+
+
+def _published(content, item):
+    # 구 형식: providerPublishTime(epoch) / 새 형식: content.pubDate(ISO)
+    if item.get("providerPublishTime"):
+        return float(item["providerPublishTime"])
+    try:
+        return datetime.datetime.fromisoformat(content.get("pubDate", "").replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def parse_item(raw, symbol):
+    # yfinance 뉴스 항목(구 형식 · content 중첩 새 형식 모두)을 공통 형태로
+    content = raw.get("content") or raw
+    title = (content.get("title") or "").strip()
+    if not title:
+        return None
+    link = ((content.get("canonicalUrl") or {}).get("url") or (content.get("clickThroughUrl") or {}).get("url") or raw.get("link") or "")
+    normalized = normalize_title(title)
+    item = {"title": title, "link": link, "publisher": (content.get("provider") or {}).get("displayName") or raw.get("publisher", ""),
+            "published": _published(content, raw), "symbols": [symbol], "normalized": normalized}
+    keys = [f"title:{hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]}"]
+    if raw.get("uuid") or raw.get("id"):
+        keys.append(f"id:{raw.get('uuid') or raw.get('id')}")
+    if normalize_link(link):
+        keys.append(f"link:{normalize_link(link)}")
+    item["keys"] = keys
+    return item
+
+
+def _fetch(symbol, count):
+    import yfinance as yf
+
+    with stage("yfinance.news", symbol=symbol):
+        return [i for i in (parse_item(raw, symbol) for raw in (yf.Ticker(symbol).get_news(count=count) or [])) if i]
+
+
+def fetch_all(tickers=NEWS_TICKERS, count=NEWS_PER_TICKER):
+    # 종목별 피드를 동시에 받고, 여러 피드에 실린 같은 기사는 하나로 합칩니다 (실패한 피드는 건너뜀)
+    def fetch(symbol):
+        try:
+            return _fetch(symbol, count)
+        except Exception as e:
+            incr("news.feed_failed")
+            print(f"⚠️ {symbol} 뉴스 조회 실패: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=len(tickers), thread_name_prefix="news") as executor:
+        feeds = list(executor.map(fetch, tickers))
+    if all(feed is None for feed in feeds):
+        raise RuntimeError("모든 뉴스 피드 조회 실패")
+
+    merged, owner = [], {}
+    for item in (i for feed in feeds if feed for i in feed):
+        existing = next((owner[k] for k in item["keys"] if k in owner), None)
+        if existing is None:
+            merged.append(item)
+            existing = item
+        else:
+            existing["symbols"] = list(dict.fromkeys(existing["symbols"] + item["symbols"]))
+            existing["keys"] = list(dict.fromkeys(existing["keys"] + item["keys"]))
+            existing["published"] = existing["published"] or item["published"]
+        for k in item["keys"]:
+            owner[k] = existing
+    return merged
+
+
+def split_seen(items):
+    # 이전 실행에서 본 기사와 처음 보는 기사로 나눕니다 (키 전체를 한 번의 조회로)
+    keys = [k for item in items for k in item["keys"]]
+    if not keys:
+        return [], []
+    with connect(DB_NAME) as conn:
+        _init(conn)
+        seen = {row[0] for row in conn.execute(f"SELECT key FROM seen WHERE key IN ({','.join('?' * len(keys))})", keys)}
+    new = [i for i in items if not seen.intersection(i["keys"])]
+    return new, [i for i in items if seen.intersection(i["keys"])]
+
+
+def remember(keys, days=NEWS_KEEP_DAYS):
+    # 저장된 브리핑에 실린 기사 키만 기록합니다 (briefing.save 에서 호출) — 읽기만 해서는 상태가 바뀌지 않도록
+    now = time.time()
+    with connect(DB_NAME) as conn:
+        _init(conn)
+        conn.executemany("INSERT OR IGNORE INTO seen VALUES (?, ?)", [(k, now) for k in keys])
+        conn.execute("DELETE FROM seen WHERE first_seen < ?", (now - days * 86400,))
+
+
+def score(item, now=None):
+    # 최신성(반감기) × (1 + 키워드 관련도 + 여러 피드에 실린 정도)
+    now = now or time.time()
+    age_hours = max(0.0, (now - item["published"]) / 3600) if item["published"] else NEWS_HALF_LIFE_HOURS
+    padded = f" {item['normalized']} "
+    relevance = sum(w for kw, w in KEYWORDS.items() if (f" {kw} " in padded if kw.isascii() else kw in padded))
+    return math.pow(0.5, age_hours / NEWS_HALF_LIFE_HOURS) * (1 + relevance + 0.5 * (len(item["symbols"]) - 1))
+
+
+def select(items, limit=NEWS_LIMIT, budget=NEWS_CHAR_BUDGET):
+    # 점수 순으로 기사 수 · 글자 수 한도 안에 들어가는 만큼만
+    now = time.time()
+    chosen, used = [], 0
+    for item in sorted(items, key=lambda i: score(i, now), reverse=True):
+        if len(chosen) >= limit:
+            break
+        if used + len(item["title"]) > budget:
+            continue
+        chosen.append(item)
+        used += len(item["title"])
+    return chosen
+
+
+def ingest(tickers=NEWS_TICKERS, limit=NEWS_LIMIT, budget=NEWS_CHAR_BUDGET):
+    # 반환: (프롬프트에 넣을 새 기사, 채워 넣은 지난 기사) — "새 기사"는 지난번 저장된 브리핑 이후 기준이라
+    # 브리핑이 저장되기 전까지는 몇 번을 읽어도 같은 결과 (같은 프롬프트 → AI 캐시 · 단일 생성 그대로 적용)
+    with stage("news.ingest", feeds=len(tickers)) as span:
+        items = fetch_all(tickers)
+        new, seen = split_seen(items)
+        fresh = select(new, limit, budget)
+        carried = []
+        if len(fresh) < NEWS_MIN_ITEMS:
+            carried = select(seen, NEWS_MIN_ITEMS - len(fresh), budget - sum(len(i["title"]) for i in fresh))
+        span.update(fetched=len(items), new=len(new), used=len(fresh), carried=len(carried))
+    return fresh, carried
+
+
+def headlines(tickers=NEWS_TICKERS):
+    # 반환: (브리핑 프롬프트용 뉴스 문단 — 기존 "1. 제목" 줄 형식, 브리핑이 저장되면 본 것으로 기록할 새 기사 키)
+    try:
+        fresh, carried = ingest(tickers)
+    except Exception as e:
+        print(f"⚠️ 뉴스 수집 실패: {e}")
+        return NEWS_FAILED, []
+    lines = [f"{n}. {item['title']}" for n, item in enumerate(fresh, 1)]
+    lines += [f"{n}. (지난 브리핑 이후 계속) {item['title']}" for n, item in enumerate(carried, len(fresh) + 1)]
+    return ("\n".join(lines) + "\n" if lines else NEWS_EMPTY), [k for item in fresh for k in item["keys"]]
@@ -1,123 +1,268 @@
-import yfinance as yf
-import google.generativeai as genai
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import argparse
 import datetime
-import os
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import json
+import os
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import briefing
+import ledger
+from mailer import SMTP_WORKERS, RateLimiter, SMTPPool, send_bulk, summarize
+from mail_template import PreparedMessage, render_briefing_html
+from market_data import GLOBAL_TICKERS, get_quotes
+from llm_cache import generate_text
+from storage import data_path
+from profiles import DEFAULT_PROFILE, label
+from subscribers import active_profiles, active_subscribers, sync_sheet
+from resources import get_model, get_sheet
+from telegram_bot import broadcast, parse_chat_ids
+from tracing import emit, incr, stage, stage_summary, start_trace
+
+# 단계별 제한 시간(초) — 넘으면 대체값으로 진행하고, 늦게 끝난 작업의 결과는 버립니다
+STAGE_TIMEOUTS = {"quotes": 30, "news": 15, "llm": 120, "subscribers": 60, "smtp_login": 30, "telegram": 120, "tts": 180, "personalize": 180}
+
+CHANNELS = ("email", "telegram")
+
+def job_send_newsletter(shard=0, shards=1, channels=CHANNELS, use_snapshot=False):
+    # shard/shards: 구독자를 해시로 shards 등분해 그중 shard 번째 몫만 발송 (워크플로 matrix 로 병렬 실행)
+    # use_snapshot: 새로 생성하지 않고 저장된 latest.json 만 사용 (재실행해도 같은 브리핑 ID → 원장으로 이어받기)
+    # ⏱️ 단계별 소요 시간은 JSON 로그로 남기고, 끝나면 전체 집계를 한 줄로 출력합니다
+    start_trace(f"newsletter-{shard}of{shards}")
+    try:
+        with stage("newsletter.job", shard=shard, shards=shards):
+            return _run_newsletter(shard, shards, channels, use_snapshot)
+    finally:
+        emit("stage_summary", **stage_summary())
+
+
+def _wait(name, future, fallback):
+    # 제한 시간 안에 끝나지 않거나 실패하면 fallback() 값으로 대신합니다
+    try:
+        return future.result(timeout=STAGE_TIMEOUTS[name])
+    except Exception as e:
+        incr(f"fallback.{name}")
+        emit("stage_fallback", stage=name, error=f"{type(e).__name__}: {e}")
+        print(f"⚠️ {name} 단계 지연/실패 → 대체값으로 진행합니다: {type(e).__name__} {e}")
+        return fallback()
+
+
+def _fallback_quotes(previous):
+    # 로컬 저장소의 마지막 시세 → 지난 스냅샷의 시세 순으로 대신합니다
+    quotes = get_quotes(GLOBAL_TICKERS, refresh=False)
+    if all(q[0] == q[0] for q in quotes.values()):  # NaN 이 없으면 사용
+        return quotes
+    if previous:
+        return {t: tuple(v) for t, v in previous["quotes"].items()}
+    raise RuntimeError("시세를 불러오지 못했고 저장된 시세도 없습니다")
+
+
+def _build_briefing(executor, model, previous):
+    # 시세 ─┐
+    # 뉴스 ─┴→ AI 분석 → 스냅샷 저장
+    quotes_future = executor.submit(get_quotes, GLOBAL_TICKERS)
+    news_future = executor.submit(briefing.fetch_news)
+    news_text, news_keys = _wait("news", news_future, lambda: (briefing.NEWS_DELAYED, []))
+    inputs = {"quotes": _wait("quotes", quotes_future, lambda: _fallback_quotes(previous)),
+              "news_text": news_text, "news_keys": news_keys}
+
+    llm_future = executor.submit(generate_text, model, briefing.build_prompt(inputs), version=briefing.PROMPT_VERSION)
+    ai_text = _wait("llm", llm_future, lambda: None)
+    if ai_text is None:
+        return briefing.save(briefing.new_artifact(inputs, briefing.fallback_text(inputs), degraded=True))
+    return briefing.save(briefing.new_artifact(inputs, ai_text))
+
+
+def _sync_subscribers():
+    # 구글 시트의 새 행만 로컬 구독자 저장소로 동기화한 뒤 로컬 명단 읽기
+    try:
+        # 🔒 깃허브 금고에서 JSON 출입증 꺼내기
+        sync_sheet(get_sheet(os.environ.get("GCP_CREDENTIALS")))
+    except Exception as e:
+        print(f"❌ 구글 시트 동기화 실패 (저장된 로컬 명단으로 발송): {e}")
+    return active_subscribers(with_profile=True)
+
+
+def _send_telegram(artifact, shard):
+    # 📱 같은 스냅샷을 텔레그램 채팅방/채널에도 전송 (설정된 경우에만, 이미 받은 채팅방은 제외)
+    telegram_token = os.environ.get("TELEGRAM_BOT_TOKEN")
+    telegram_chats = ledger.pending(artifact["id"], "telegram", parse_chat_ids(os.environ.get("TELEGRAM_CHAT_ID")))
+    if not (telegram_token and telegram_chats):
+        return []
+    results = broadcast(telegram_token, telegram_chats, artifact["ai_text"])
+    with ledger.Recorder(artifact["id"], "telegram", shard) as recorder:
+        for r in results:
+            recorder.add(r["chat_id"], r["ok"], error=r["error"])
+            if r["ok"]:
+                print(f"📱 텔레그램 {r['chat_id']} 전송 성공 ({r['parts']}개 메시지)")
+            else:
+                print(f"❌ 텔레그램 {r['chat_id']} 전송 실패: {r['error']}")
+    return results
+
+
+def _write_report(report):
+    # 샤드별 보고서 — 워크플로의 report 단계가 모아서 merge_reports 로 합칩니다
+    path = data_path("reports", f"shard-{report['shard']}-of-{report['shards']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    emit("delivery_report", **report)
+    return path
+
+
+def print_report(report):
+    for channel, counts in report["counts"].items():
+        print(f"📊 {channel}: 성공 {counts.get('sent', 0)} / 실패 {counts.get('failed', 0)}")
+    print(f"⏭️ 이전 실행에서 이미 받은 수신자(건너뜀): {report['skipped']}명")
+    if report.get("missing_shards"):
+        print(f"⚠️ 보고서가 없는 샤드: {report['missing_shards']}")
+    for failure in report["failures"][:20]:
+        print(f"❌ [{failure['channel']}] {failure['recipient']}: {failure['error']}")
+
+
+def _run_newsletter(shard, shards, channels, use_snapshot):
+    print(f"[{datetime.datetime.now()}] 🚀 이브(Eve)가 무인 서버에서 모닝 브리핑 발송을 시작합니다... (샤드 {shard + 1}/{shards})")
 
-def job_send_newsletter():
-    print(f"[{datetime.datetime.now()}] 🚀 이브(Eve)가 무인 서버에서 모닝 브리핑 발송을 시작합니다...")
-    
     # 🔒 깃허브 비밀 금고(환경 변수)에서 정보 꺼내기
     MY_API_KEY = os.environ.get("API_KEY")
     sender_email = os.environ.get("SENDER_EMAIL")
     app_password = os.environ.get("APP_PASSWORD")
 
-    genai.configure(api_key=MY_API_KEY, transport="rest")
-    model = genai.GenerativeModel('gemini-2.5-flash')
+    model = get_model(MY_API_KEY)
+
+    # 🕸️ 서로 기다릴 필요 없는 단계는 동시에 출발시킵니다
+    #   시세 + 뉴스 → AI 분석 → 본문 확정 ─┬→ 메일 발송
+    #   구독자 동기화 ─────────────────────┤
+    #   SMTP 로그인 ───────────────────────┘
+    #                              본문 확정 ─┬→ 텔레그램
+    #                                         └→ 음성(TTS)
+    executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="newsletter")
+    smtp_pool = SMTPPool(sender_email, app_password)
+    send_email = "email" in channels
+    try:
+        if send_email:
+            subscribers_future = executor.submit(_sync_subscribers)
+            login_future = executor.submit(smtp_pool.warm, SMTP_WORKERS)
+
+        # 1~2. 지표·뉴스 수집 + AI 분석 → 브리핑 스냅샷 (이미 신선한 스냅샷이 있으면 그대로 사용)
+        previous = briefing.load_latest()
+        tts_future = None
+        with stage("newsletter.briefing") as span:
+            span["reused"] = use_snapshot or briefing.is_fresh(previous)
+            if span["reused"]:
+                if not previous:
+                    raise RuntimeError("저장된 브리핑 스냅샷이 없습니다 (--use-snapshot)")
+                artifact = previous
+                print(f"📦 기존 브리핑 스냅샷 재사용: {artifact['id']}")
+            else:
+                artifact = _build_briefing(executor, model, previous)
+                span["degraded"] = artifact["degraded"]
+                tts_future = executor.submit(briefing.attach_audio, artifact)
+                print(f"📦 새 브리핑 스냅샷 생성: {artifact['id']}")
+        ai_text = artifact["ai_text"]
+        telegram_future = executor.submit(_send_telegram, artifact, shard) if "telegram" in channels else None
+
+        skipped, recipients, profile_of = 0, [], {}
+        if send_email:
+            # 3. 구독자 명단 (동기화가 늦으면 저장된 로컬 명단으로) → 내 샤드 몫 → 이미 받은 사람 제외
+            with stage("newsletter.subscribers") as span:
+                profile_of = dict(_wait("subscribers", subscribers_future, lambda: active_subscribers(with_profile=True)))
+                subscribers = ledger.select_shard(list(profile_of), shard, shards)
+                recipients = ledger.pending(artifact["id"], "email", subscribers)
+                skipped = len(subscribers) - len(recipients)
+                span.update(count=len(subscribers), pending=len(recipients))
 
-    # 1. 데이터 수집
-    def get_data(ticker):
-        hist = yf.Ticker(ticker).history(period="5d")
-        current = round(hist['Close'].iloc[-1], 2)
-        previous = round(hist['Close'].iloc[-2], 2)
-        return current, round(current - previous, 2), round(((current - previous) / previous) * 100, 2)
+        # 🎯 맞춤 브리핑: 이번에 보낼 사람들의 프로필 종류마다 1회씩 생성 (--use-snapshot 이면 스냅샷에 있는 것만 사용)
+        if not use_snapshot:
+            keys = {profile_of[r] for r in recipients} if send_email else set(active_profiles())
+            with stage("newsletter.personalize", profiles=len(keys)):
+                _wait("personalize", executor.submit(briefing.personalize, model, artifact, keys), lambda: artifact)
 
-    ndx = get_data("^IXIC")
-    tnx = get_data("^TNX")
-    vix = get_data("^VIX")
-    krw = get_data("KRW=X")
+        if send_email:
+            if not subscribers:
+                print("📭 시트에 구독자가 0명입니다.")
+            elif not recipients:
+                print(f"⏭️ 이 샤드의 구독자 {len(subscribers)}명 모두 이미 발송 완료된 브리핑입니다.")
+            else:
+                # 4. 1:N 이메일 병렬 발송 (미리 로그인한 SMTP 세션 풀 + 발송 한도 + 일시 오류 재시도)
+                # 본문은 프로필마다 한 번만 렌더링·인코딩하고 수신자별로는 To 헤더만 바꿉니다
+                if skipped:
+                    print(f"⏭️ 이전 실행에서 이미 받은 {skipped}명은 건너뜁니다.")
+                _wait("smtp_login", login_future, lambda: 0)
+                # 스냅샷에 없는 프로필(생성 실패·지연, 샤드 발송 중 새로 가입)은 기본 브리핑을 받습니다
+                texts = dict(artifact.get("profiles", {}))
+                groups = {}
+                for r in recipients:
+                    groups.setdefault(profile_of[r] if profile_of[r] in texts else DEFAULT_PROFILE, []).append(r)
+                subject = f'🌤️ 이브(Eve)의 모닝 브리핑 ({datetime.date.today()} 기준)'
+                messages = {key: PreparedMessage(subject, sender_email, render_briefing_html(texts.get(key, ai_text))) for key in groups}
+                message_of = {r: messages[key] for key, members in groups.items() for r in members}
+                for key, members in groups.items():
+                    print(f"🎯 {label(key)}: {len(members)}명")
+                # 🧾 결과는 발송되는 대로 원장에 기록 — 도중에 죽어도 재실행 시 성공한 수신자는 건너뜁니다
+                with ledger.Recorder(artifact["id"], "email", shard) as recorder:
+                    # 샤드들이 같은 계정으로 동시에 보내므로 초당 · 하루 한도를 샤드 수로 나눠 씁니다
+                    results = send_bulk(sender_email, app_password, recipients, lambda r: message_of[r].for_recipient(r), pool=smtp_pool,
+                                        limiter=RateLimiter(shards=shards), on_result=lambda r: recorder.add(r["recipient"], r["ok"], r["attempts"], r["error"]))
+                for r in results:
+                    if r["ok"]:
+                        print(f"✅ {r['recipient']} 발송 성공!")
+                    elif r["attempts"]:
+                        print(f"❌ {r['recipient']} 발송 실패 ({r['attempts']}회 시도): {r['error']}")
+                report = summarize(results)
+                if report["not_attempted"]:
+                    print(f"🛑 발송 중단으로 시도하지 않은 수신자 {report['not_attempted']}명: {next(r['error'] for r in results if not r['attempts'])}")
+                print(f"📬 발송 완료: 성공 {report['sent']}명 / 실패 {report['failed']}명 (총 {report['total']}명)")
 
-    # 2. 뉴스 수집
-    news_titles, news_text = [], ""
+        if telegram_future:
+            _wait("telegram", telegram_future, list)
+        if tts_future:
+            _wait("tts", tts_future, lambda: None)
+    finally:
+        smtp_pool.close()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # 5. 이 샤드의 누적 발송 보고서 (이전 실행분 포함)
+    report = ledger.report(artifact["id"], shard, shards, skipped=skipped)
+    _write_report(report)
+    print_report(report)
+    ledger.prune()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="이브(Eve) 모닝 브리핑 발송")
+    parser.add_argument("--shard", default="0/1", help="샤드 번호/전체 샤드 수 (예: 2/4 → 세 번째 몫만 발송)")
+    parser.add_argument("--channels", default=",".join(CHANNELS), help="발송 채널 (email,telegram)")
+    parser.add_argument("--use-snapshot", action="store_true", help="새로 생성하지 않고 저장된 브리핑 스냅샷으로 발송")
+    parser.add_argument("--merge-reports", metavar="DIR", help="샤드별 보고서(JSON)를 모아 전체 요약만 출력")
+    args = parser.parse_args()
+
+    if args.merge_reports:
+        merged = ledger.merge_reports(ledger.load_reports(args.merge_reports))
+        print(f"🧾 브리핑 {', '.join(merged['briefing_ids']) or '-'} 전체 발송 요약")
+        print_report(merged)
+        return
+    shard, shards = (int(x) for x in args.shard.split("/"))
     try:
-        spy_ticker = yf.Ticker("SPY")
-        all_news = spy_ticker.get_news()[:5] 
-        for news in all_news:
-            title = news.get('title', '')
-            if title and title not in news_titles:
-                news_titles.append(title)
-                news_text += f"{len(news_titles)}. {title}\n"
+        job_send_newsletter(shard, shards, tuple(c for c in args.channels.split(",") if c), args.use_snapshot)
     except Exception:
-        news_text = "현재 서버 통신 문제로 뉴스를 불러오지 못했습니다."
-
-    if not news_text.strip():
-        news_text = "오늘 장에 큰 영향을 미칠만한 특별한 거시경제 뉴스가 없습니다."
-
-    # 💡 [마크다운 방지 프롬프트 추가!]
-    prompt = f"""
-    너는 사용자의 스마트한 경제 비서이자 전속 아나운서인 '이브(Eve)'야.
-    [데이터] 나스닥:{ndx[0]}({ndx[2]}%), 금리:{tnx[0]}%, VIX:{vix[0]}, 환율:{krw[0]}원
-    [뉴스] {news_text}
-    
-    1. 반드시 "안녕하세요! 여러분의 경제 비서 이브입니다." 라고 다정하게 시작해.
-    2. 시장 날씨, KOSPI 예상, 대출 금리 영향을 분석해줘.
-    
-    🚨 [매우 중요 규칙]
-    절대로 마크다운 기호(*, #, -, ` 등)를 사용하지 마! 
-    글자를 강조하고 싶을 때는 반드시 HTML <b>태그를 쓰고, 줄바꿈은 <br> 태그만 사용해서 아주 깔끔하게 작성해.
-    """
-    response = model.generate_content(prompt)
-    ai_text = response.text
-
-    # 3. 구글 시트에서 구독자 명단 읽어오기
-    try:
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        # 🔒 깃허브 금고에서 JSON 출입증 꺼내기
-        creds_dict = json.loads(os.environ.get("GCP_CREDENTIALS"))
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-        client = gspread.authorize(creds)
-        
-        sheet = client.open("EconBrief 구독자").sheet1
-        emails_data = sheet.col_values(1) 
-        
-        subscribers = []
-        for email in emails_data[1:]:
-            if "@" in email and email not in subscribers: 
-                subscribers.append(email)
-                
-    except Exception as e:
-        print(f"❌ 구글 시트 연결 실패: {e}")
-        return
+        traceback.print_exc()
+        _exit(1)
+    _exit(0)
 
-    if not subscribers:
-        print("📭 시트에 구독자가 0명입니다.")
-        return
 
-    # 4. 1:N 이메일 발송
-    with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-        server.login(sender_email, app_password)
-        
-        success_count = 0
-        for receiver in subscribers:
-            msg = MIMEMultipart()
-            msg['Subject'] = f'🌤️ 이브(Eve)의 모닝 브리핑 ({datetime.date.today()} 기준)'
-            msg['From'] = sender_email
-            msg['To'] = receiver
-            
-            html_content = f"""
-            <html>
-              <body style="font-family: Arial, sans-serif; line-height:1.6;">
-                <h2 style="color: #2e6c80;">📈 오늘의 거시경제 시황</h2>
-                <p>{ai_text}</p>
-                <hr>
-                <p style="color:gray; font-size:12px;"><i>이브(Eve) 무인 서버가 아침 7시에 자동으로 발송한 메일입니다.</i></p>
-              </body>
-            </html>
-            """
-            msg.attach(MIMEText(html_content, 'html'))
-            
-            try:
-                server.send_message(msg)
-                print(f"✅ {receiver} 발송 성공!")
-                success_count += 1
-            except Exception as e:
-                print(f"❌ {receiver} 발송 실패: {e}")
+def _exit(code):
+    # 제한 시간을 넘긴 단계의 작업 스레드(멈춘 yfinance · Gemini 호출 등)는 취소할 수 없고,
+    # 인터프리터는 종료할 때 ThreadPoolExecutor 스레드가 끝나기를 기다립니다 → 크론 프로세스가 타임아웃을 넘겨 살아 있게 됨
+    # 보고서 · 원장 기록은 이미 끝났으므로, 남은 스레드가 있으면 기다리지 않고 바로 종료합니다
+    stuck = [t.name for t in threading.enumerate() if t is not threading.main_thread() and not t.daemon and t.is_alive()]
+    if not stuck:
+        sys.exit(code)
+    print(f"⏹️ 끝나지 않은 작업 스레드 {len(stuck)}개를 기다리지 않고 종료합니다: {', '.join(stuck)}")
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(code)
 
 # 스케줄러 없이 파일이 실행되면 즉시 딱 1번만 일하고 종료!
 if __name__ == "__main__":
-    job_send_newsletter()
\ No newline at end of file
+    main()
@@ -0,0 +1,145 @@
+import time
+import pandas as pd
+import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor
+from storage import connect
+from tracing import stage
+
+# ==========================================
+# 🗄️ 증분 OHLCV 캐시 (종목 × 날짜 단위 SQLite 저장소)
+# ==========================================
+DB_NAME = "prices.db"
+OHLCV = ["Open", "High", "Low", "Close", "Volume"]
+# 마지막 동기화 후 이 시간(초) 안에는 네트워크 호출 없이 저장된 값만 사용
+REFRESH_TTL = 300
+
+PERIOD_OFFSETS = {
+    "1mo": pd.DateOffset(months=1), "3mo": pd.DateOffset(months=3), "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1), "2y": pd.DateOffset(years=2), "5y": pd.DateOffset(years=5), "10y": pd.DateOffset(years=10),
+}
+
+
+def _init(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS prices (
+        symbol TEXT NOT NULL, date TEXT NOT NULL,
+        open REAL, high REAL, low REAL, close REAL, volume REAL,
+        PRIMARY KEY (symbol, date))""")
+    # period: 지금까지 받아둔 가장 긴 구간, synced_at: 마지막 증분 동기화 시각
+    conn.execute("""CREATE TABLE IF NOT EXISTS sync_state (
+        symbol TEXT PRIMARY KEY, period TEXT, synced_at REAL)""")
+
+
+def _strip_tz(index):
+    return index.tz_localize(None) if getattr(index, "tz", None) is not None else index
+
+
+def _history(symbol, **kwargs):
+    with stage("yfinance.history", symbol=symbol):
+        df = yf.Ticker(symbol).history(**kwargs)
+    df.index = _strip_tz(df.index)
+    return df
+
+
+def _download(symbols, **kwargs):
+    # 여러 종목을 한 번의 요청으로 받고, 빠진 종목만 종목별로 병렬 재시도합니다
+    frames = {}
+    try:
+        with stage("yfinance.download", symbols=len(symbols)):
+            raw = yf.download(symbols, group_by="column", auto_adjust=True, threads=True, progress=False, **kwargs)
+        raw.index = _strip_tz(raw.index)
+        for sym in symbols:
+            if isinstance(raw.columns, pd.MultiIndex):
+                if sym not in raw.columns.get_level_values(1):
+                    continue
+                df = raw.xs(sym, axis=1, level=1)
+            else:
+                df = raw
+            frames[sym] = df
+    except Exception as e:
+        print(f"⚠️ 일괄 시세 조회 실패, 종목별 병렬 조회로 전환합니다: {e}")
+
+    frames = {s: df for s, df in frames.items() if not df['Close'].dropna().empty}
+    missing = [s for s in symbols if s not in frames]
+    if missing:
+        with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+            for sym, df in zip(missing, pool.map(lambda s: _history(s, **kwargs), missing)):
+                frames[sym] = df
+    return {s: df.reindex(columns=OHLCV).dropna(subset=["Close"]) for s, df in frames.items()}
+
+
+def _save(conn, symbol, df):
+    rows = [(symbol, ts.strftime("%Y-%m-%d"), *(None if pd.isna(v) else float(v) for v in vals))
+            for ts, vals in zip(df.index, df[OHLCV].itertuples(index=False))]
+    conn.executemany("INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+def _covers(state_period, period):
+    # 이미 받아둔 구간이 요청 구간을 포함하는지 판단
+    if state_period == "max":
+        return True
+    if period == "max" or state_period is None:
+        return False
+    if period.endswith("d") and state_period.endswith("d"):
+        return int(period[:-1]) <= int(state_period[:-1])
+    if period.endswith("d"):
+        return True
+    if state_period.endswith("d") or period not in PERIOD_OFFSETS:
+        return False
+    today = pd.Timestamp.today()
+    return today - PERIOD_OFFSETS[state_period] <= today - PERIOD_OFFSETS[period]
+
+
+def sync(symbols, period="5d"):
+    # 종목별로 마지막 저장 시점 이후의 봉만 받아와 덧붙입니다
+    symbols = list(dict.fromkeys(symbols))
+    now = time.time()
+    with connect(DB_NAME) as conn:
+        _init(conn)
+        state = {r[0]: r[1:] for r in conn.execute("SELECT symbol, period, synced_at FROM sync_state")}
+        last = dict(conn.execute("SELECT symbol, MAX(date) FROM prices GROUP BY symbol"))
+
+        backfill = [s for s in symbols if s not in last or not _covers(state.get(s, (None,))[0], period)]
+        stale = [s for s in symbols if s not in backfill and now - (state[s][1] or 0) > REFRESH_TTL]
+
+        if backfill:
+            for sym, df in _download(backfill, period=period).items():
+                _save(conn, sym, df)
+                # 열 이름을 지정해 예전 DB(쓰이지 않던 first_date 열이 남아 있음)에도 그대로 기록
+                conn.execute("INSERT OR REPLACE INTO sync_state (symbol, period, synced_at) VALUES (?, ?, ?)", (sym, period, now))
+
+        if stale:
+            # 마지막 저장 봉은 장중에 갱신됐을 수 있으므로 그 날짜부터 다시 받습니다
+            start = min(last[s] for s in stale)
+            for sym, df in _download(stale, start=start).items():
+                _save(conn, sym, df[df.index >= pd.Timestamp(last[sym])])
+            conn.executemany("UPDATE sync_state SET synced_at = ? WHERE symbol = ?", [(now, s) for s in stale])
+
+
+def load(symbol, period="5d"):
+    with connect(DB_NAME) as conn:
+        _init(conn)
+        if period.endswith("d") and period[:-1].isdigit():
+            query = "SELECT * FROM (SELECT date, open, high, low, close, volume FROM prices WHERE symbol = ? ORDER BY date DESC LIMIT ?) ORDER BY date"
+            params = (symbol, int(period[:-1]))
+        elif period in PERIOD_OFFSETS:
+            since = (pd.Timestamp.today() - PERIOD_OFFSETS[period]).strftime("%Y-%m-%d")
+            query = "SELECT date, open, high, low, close, volume FROM prices WHERE symbol = ? AND date >= ? ORDER BY date"
+            params = (symbol, since)
+        else:
+            query = "SELECT date, open, high, low, close, volume FROM prices WHERE symbol = ? ORDER BY date"
+            params = (symbol,)
+        rows = conn.execute(query, params).fetchall()
+    df = pd.DataFrame(rows, columns=["Date"] + OHLCV)
+    df.index = pd.to_datetime(df.pop("Date"))
+    return df
+
+
+def get_history(symbol, period="1mo"):
+    # yf.Ticker(symbol).history(period=...) 대체: 저장소를 먼저 동기화한 뒤 로컬에서 읽습니다
+    sync([symbol], period)
+    return load(symbol, period)
+
+
+def get_closes(symbols, period="5d"):
+    sync(symbols, period)
+    return pd.DataFrame({s: load(s, period)['Close'] for s in dict.fromkeys(symbols)})
@@ -0,0 +1,79 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+# ==========================================
+# 🎯 맞춤 브리핑 프로필 (관심사 → 소수의 프로필 키 → 프로필당 AI 생성 1회)
+# ==========================================
+# 관심 분야: 프롬프트에 넣을 추가 지표와 분석 초점
+TOPICS = {
+    "kospi": {"label": "🇰🇷 코스피·국내 증시", "tickers": ["^KS11", "^KQ11"], "focus": "KOSPI·KOSDAQ 흐름과 외국인 수급, 국내 증시 영향"},
+    "fx": {"label": "💱 환율", "tickers": ["KRW=X"], "focus": "원/달러 환율 방향과 수출기업·해외투자·여행 경비 영향"},
+    "us_tech": {"label": "💻 미국 기술주", "tickers": ["^IXIC", "QQQ"], "focus": "나스닥 빅테크·반도체 종목 흐름"},
+    "rates": {"label": "🏦 금리·대출", "tickers": ["^TNX"], "focus": "미 국채 금리와 국내 대출·예금 금리 영향"},
+}
+# 시트에 자유롭게 적힌 관심사 표기 → 표준 토픽
+ALIASES = {
+    "kospi": "kospi", "코스피": "kospi", "kosdaq": "kospi", "코스닥": "kospi", "국내": "kospi", "국내증시": "kospi", "국내 증시": "kospi",
+    "fx": "fx", "환율": "fx", "달러": "fx", "원달러": "fx", "krw": "fx", "외환": "fx",
+    "us_tech": "us_tech", "us-tech": "us_tech", "us tech": "us_tech", "미국 기술주": "us_tech", "미국기술주": "us_tech",
+    "나스닥": "us_tech", "nasdaq": "us_tech", "빅테크": "us_tech", "반도체": "us_tech",
+    "rates": "rates", "금리": "rates", "대출": "rates", "채권": "rates", "국채": "rates",
+}
+# 한 사람당 반영할 최대 관심사 수 — 프로필 종류를 1 + 4 + 6 = 11개 이하로 묶어 둡니다
+MAX_TOPICS = 2
+DEFAULT_PROFILE = "global"
+# 프로필별 AI 생성 동시 실행 수 (Gemini 분당 한도 보호)
+PROFILE_CONCURRENCY = int(os.environ.get("PROFILE_CONCURRENCY", "3"))
+
+
+def profile_key(preferences):
+    # "KOSPI, 환율" / "환율/코스피" → "fx+kospi" — 표기·순서가 달라도 같은 키
+    topics = []
+    for token in re.split(r'[,/;|+]+', preferences or ""):
+        topic = ALIASES.get(token.strip().lower())
+        if topic and topic not in topics:
+            topics.append(topic)
+    return "+".join(sorted(topics[:MAX_TOPICS])) or DEFAULT_PROFILE
+
+
+def topics_of(key):
+    return [] if key == DEFAULT_PROFILE else key.split("+")
+
+
+def label(key):
+    return " · ".join(TOPICS[t]["label"] for t in topics_of(key)) or "🌐 글로벌 기본"
+
+
+def profile_tickers(keys):
+    return list(dict.fromkeys(t for key in keys for topic in topics_of(key) for t in TOPICS[topic]["tickers"]))
+
+
+def build_profile_prompt(base_prompt, key, quotes):
+    # 기본 브리핑 프롬프트에 관심 지표와 분석 초점만 덧붙입니다
+    lines = [f"{t}: {quotes[t][0]} ({quotes[t][2]}%)" for t in profile_tickers([key]) if t in quotes]
+    focus = " / ".join(TOPICS[t]["focus"] for t in topics_of(key))
+    return f"""{base_prompt}
+    [구독자 관심 분야] {label(key)}
+    [관심 지표] {", ".join(lines)}
+    4. 위 관심 분야({focus})를 브리핑의 중심에 두고, 나머지 지표는 짧게 요약해줘.
+    """
+
+
+def generate_all(model, base_prompt, keys, quotes, version, max_workers=PROFILE_CONCURRENCY):
+    # 서로 다른 프로필마다 1회씩, 동시에 최대 max_workers 개까지 생성합니다 (실패한 프로필은 빠짐 → 기본 브리핑으로 대체)
+    from llm_cache import generate_text
+
+    keys = [k for k in dict.fromkeys(keys) if k != DEFAULT_PROFILE]
+    if not keys:
+        return {}
+
+    def generate(key):
+        try:
+            return key, generate_text(model, build_profile_prompt(base_prompt, key, quotes), version=version)
+        except Exception as e:
+            print(f"⚠️ 맞춤 브리핑 생성 실패 ({key}, 기본 브리핑으로 대체): {e}")
+            return key, None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(keys)))) as executor:
+        return {key: text for key, text in executor.map(generate, keys) if text}
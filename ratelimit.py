@@ -0,0 +1,42 @@
+import threading
+import time
+
+# ==========================================
+# 🚦 초당 발송 한도 (토큰 버킷) — 메일·텔레그램 공용
+# ==========================================
+class TokenBucket:
+    # per_second 가 0 이하면 한도 없음 — 1 미만(예: 0.5 = 2초에 1통)도 쌓아 둘 수 있는 토큰은 최소 1개
+    def __init__(self, per_second):
+        self.per_second = per_second
+        self.capacity = max(1.0, per_second)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _check(self):
+        # 하위 클래스에서 추가 한도(예: 하루 발송량)를 검사할 때 사용
+        pass
+
+    def _consumed(self):
+        pass
+
+    def release(self, sent):
+        # acquire() 로 받은 발송 자리의 결과 (sent=False 면 실패 · 재시도 — 하위 클래스에서 집계)
+        pass
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._check()
+                if self.per_second <= 0:
+                    self._consumed()
+                    return
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_second)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self._consumed()
+                    return
+                wait = (1 - self.tokens) / self.per_second
+            time.sleep(wait)
@@ -0,0 +1,69 @@
+import collections
+import functools
+import json
+import threading
+import time
+from tracing import emit
+
+# ==========================================
+# 🧰 공용 클라이언트 레이어 (프로세스당 1회 생성 후 재사용)
+# ==========================================
+# 무거운 라이브러리는 실제로 필요한 순간에만 import 합니다
+GEMINI_MODEL = "gemini-2.5-flash"
+PROCESS_STARTED = time.perf_counter()
+
+_timings = collections.deque(maxlen=500)
+_timings_lock = threading.Lock()
+_warm = False
+
+
+@functools.lru_cache(maxsize=None)
+def get_model(api_key, model_name=GEMINI_MODEL):
+    import google.generativeai as genai
+    genai.configure(api_key=api_key, transport="rest")
+    return genai.GenerativeModel(model_name)
+
+
+@functools.lru_cache(maxsize=None)
+def get_sheet(creds_json):
+    # 서비스 계정 인증 + 시트 열기는 한 번만 (gspread 세션이 토큰 갱신을 알아서 처리)
+    from subscribers import open_sheet
+    return open_sheet(json.loads(creds_json, strict=False))
+
+
+@functools.lru_cache(maxsize=None)
+def get_http_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=32)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def record_rerun(page, seconds):
+    # 스트림릿 재실행 1회의 소요 시간 기록 (프로세스의 첫 실행은 콜드 스타트로 표시)
+    global _warm
+    with _timings_lock:
+        cold, _warm = not _warm, True
+        entry = {"page": page, "ms": round(seconds * 1000, 1), "cold": cold, "at": time.time()}
+        if cold:
+            entry["since_process_start_ms"] = round((time.perf_counter() - PROCESS_STARTED) * 1000, 1)
+        _timings.append(entry)
+    emit("streamlit_rerun", **entry)
+
+
+def timing_summary():
+    # 페이지별 재실행 횟수와 p50 / p95 (ms)
+    with _timings_lock:
+        entries = list(_timings)
+    pages = collections.defaultdict(list)
+    for e in entries:
+        pages[e["page"]].append(e["ms"])
+    summary = {}
+    for page, values in pages.items():
+        values.sort()
+        summary[page] = {"runs": len(values), "p50_ms": values[len(values) // 2], "p95_ms": values[min(len(values) - 1, int(len(values) * 0.95))]}
+    cold = [e for e in entries if e["cold"]]
+    return {"cold_start": cold[0] if cold else None, "pages": summary}
@@ -0,0 +1,27 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+# ==========================================
+# 💾 로컬 저장소 경로 (캐시/DB 공용)
+# ==========================================
+# 스트림릿 재실행·프로세스 재시작에도 유지되는 로컬 데이터 폴더 (깃허브 액션에서는 actions/cache 로 보존)
+DATA_DIR = os.environ.get("EVE_DATA_DIR", ".eve_cache")
+
+
+def data_path(*parts):
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+@contextmanager
+def connect(db_name):
+    # 스트림릿은 세션마다 스레드가 다르므로 호출할 때마다 새 연결을 엽니다 (WAL 로 동시 읽기 허용)
+    conn = sqlite3.connect(data_path(db_name), timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            yield conn
+    finally:
+        conn.close()
@@ -0,0 +1,209 @@
+import datetime
+import os
+import threading
+from profiles import DEFAULT_PROFILE, profile_key
+from storage import connect
+from tracing import stage
+
+# ==========================================
+# 👥 로컬 구독자 저장소 (구글 시트 증분 동기화)
+# ==========================================
+DB_NAME = "subscribers.db"
+SHEET_NAME = "EconBrief 구독자"
+SHEET_SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+# 가입 직후 이 시간(초) 동안 모인 신청을 한 번의 append_rows 로 시트에 올립니다
+PUSH_DELAY = 3
+# 업로드 실패 시 재시도 횟수와 최대 대기(초) — 대기는 실패마다 두 배
+PUSH_RETRIES = 6
+PUSH_RETRY_MAX = 300
+# 시트 전체를 다시 읽어 기존 구독자의 관심사 변경을 반영하는 주기(일) — 평소에는 새 행만 읽습니다
+FULL_SYNC_DAYS = int(os.environ.get("FULL_SYNC_DAYS", "7"))
+
+_push_timer = None
+_push_lock = threading.Lock()
+
+
+def _init(conn):
+    # synced = 0 인 행은 아직 시트에 올리지 않은 가입 신청입니다
+    # preferences: 시트 C열의 관심사 원문, profile: 정규화된 맞춤 브리핑 프로필 키
+    conn.execute(f"""CREATE TABLE IF NOT EXISTS subscribers (
+        email_norm TEXT PRIMARY KEY, email TEXT NOT NULL, subscribed_at TEXT,
+        status TEXT NOT NULL DEFAULT 'active', source TEXT, synced INTEGER NOT NULL DEFAULT 1, updated_at TEXT,
+        preferences TEXT NOT NULL DEFAULT '', profile TEXT NOT NULL DEFAULT '{DEFAULT_PROFILE}')""")
+    if "profile" not in {r[1] for r in conn.execute("PRAGMA table_info(subscribers)")}:
+        # 관심사 열이 생기기 전에 만든 로컬 DB
+        conn.execute("ALTER TABLE subscribers ADD COLUMN preferences TEXT NOT NULL DEFAULT ''")
+        conn.execute(f"ALTER TABLE subscribers ADD COLUMN profile TEXT NOT NULL DEFAULT '{DEFAULT_PROFILE}'")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_subscribers_status ON subscribers (status)")
+    # last_row: 시트에서 마지막으로 읽은 행 번호 (1행은 헤더), full_at: 마지막으로 전체를 다시 읽은 시각
+    # last_key: last_row 행의 A열(정규화) — 다음 증분 읽기 때 그 행이 그대로인지(중간 행 삭제로 밀리지 않았는지) 확인
+    conn.execute("CREATE TABLE IF NOT EXISTS sheet_state (id INTEGER PRIMARY KEY CHECK (id = 1), last_row INTEGER, synced_at TEXT, full_at TEXT, last_key TEXT)")
+    columns = {r[1] for r in conn.execute("PRAGMA table_info(sheet_state)")}
+    for column in ("full_at", "last_key"):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE sheet_state ADD COLUMN {column} TEXT")
+
+
+def normalize_email(email):
+    return email.strip().lower()
+
+
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def open_sheet(creds_dict):
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SHEET_SCOPE)
+    return gspread.authorize(creds).open(SHEET_NAME).sheet1
+
+
+def add_signup(email, preferences=""):
+    # 가입 신청을 로컬에 먼저 기록합니다 (이미 활성 구독자면 False)
+    email = email.strip()
+    with connect(DB_NAME) as conn:
+        _init(conn)
+        row = conn.execute("SELECT status FROM subscribers WHERE email_norm = ?", (normalize_email(email),)).fetchone()
+        if row and row[0] == "active":
+            return False
+        conn.execute("""INSERT OR REPLACE INTO subscribers (email_norm, email, subscribed_at, status, source, synced, updated_at, preferences, profile)
+                        VALUES (?, ?, ?, 'active', 'signup', 0, ?, ?, ?)""",
+                     (normalize_email(email), email, _now(), _now(), preferences, profile_key(preferences)))
+    return True
+
+
+def set_status(email, status):
+    with connect(DB_NAME) as conn:
+        _init(conn)
+        conn.execute("UPDATE subscribers SET status = ?, updated_at = ? WHERE email_norm = ?", (status, _now(), normalize_email(email)))
+
+
+def active_subscribers(with_profile=False):
+    # with_profile=True 면 (이메일, 프로필 키) 목록
+    with connect(DB_NAME) as conn:
+        _init(conn)
+        rows = conn.execute("SELECT email, profile FROM subscribers WHERE status = 'active' ORDER BY subscribed_at, email_norm").fetchall()
+    return rows if with_profile else [r[0] for r in rows]
+
+
+def active_profiles():
+    with connect(DB_NAME) as conn:
+        _init(conn)
+        return [r[0] for r in conn.execute("SELECT DISTINCT profile FROM subscribers WHERE status = 'active' ORDER BY profile")]
+
+
+def _row_key(row):
+    return normalize_email(row[0]) if row else ""
+
+
+def pull(sheet, full=False):
+    # 지난번에 읽은 행 이후만 가져옵니다 (full=True 면 처음부터 다시 읽기)
+    # 지난번 마지막 행부터 읽어 그 행이 그대로인지 확인하고, 시트에서 행이 지워져 밀렸거나 시트가 줄었으면 전체를 다시 읽습니다
+    # 전체를 읽을 때는 시트에서 사라진 구독자(이미 시트에 올라간 행)를 구독 해지로 바꿉니다 — 시트가 구독자 명단의 기준
+    with connect(DB_NAME) as conn:
+        _init(conn)
+        row = conn.execute("SELECT last_row, last_key FROM sheet_state WHERE id = 1").fetchone()
+    last_row = 1 if full or not row else row[0]
+    anchor = row[1] if last_row > 1 and row[1] is not None else None
+
+    with stage("sheets.read", from_row=last_row if anchor is not None else last_row + 1) as span:
+        rows = sheet.get(f"A{last_row}:C" if anchor is not None else f"A{last_row + 1}:C")
+        if anchor is not None:
+            if rows and _row_key(rows[0]) == anchor:
+                rows = rows[1:]
+            else:
+                last_row, span["reset"] = 1, True
+                rows = sheet.get("A2:C")
+        span["rows"] = len(rows)
+    new = [(r[0].strip(), r[1] if len(r) > 1 else None, r[2].strip() if len(r) > 2 else "") for r in rows if r and "@" in r[0]]
+    with connect(DB_NAME) as conn:
+        _init(conn)
+        before = conn.total_changes
+        conn.executemany("""INSERT OR IGNORE INTO subscribers (email_norm, email, subscribed_at, status, source, synced, updated_at, preferences, profile)
+                            VALUES (?, ?, ?, 'active', 'sheet', 1, ?, ?, ?)""",
+                         [(normalize_email(email), email, joined, _now(), prefs, profile_key(prefs)) for email, joined, prefs in new])
+        added = conn.total_changes - before
+        # 이미 있는 구독자는 시트에서 바뀐 관심사를 반영하고, 해지됐다가 시트에 다시 올라온 사람은 다시 구독으로
+        conn.executemany("""UPDATE subscribers SET status = 'active', preferences = ?, profile = ?, updated_at = ?
+                            WHERE email_norm = ? AND (preferences IS NOT ? OR status != 'active')""",
+                         [(prefs, profile_key(prefs), _now(), normalize_email(email), prefs) for email, _, prefs in new])
+        removed = 0
+        if last_row == 1 and new:
+            # 시트에 올라간 적 있는 활성 구독자 중 지금 시트에 없는 사람 (업로드 대기 중인 synced = 0 가입 신청은 제외)
+            # 시트 읽기가 통째로 비어 오면(일시 오류 가능) 전원 해지하지 않도록 새 행이 있을 때만
+            present = {normalize_email(email) for email, _, _ in new}
+            gone = [r[0] for r in conn.execute("SELECT email_norm FROM subscribers WHERE status = 'active' AND synced = 1") if r[0] not in present]
+            conn.executemany("UPDATE subscribers SET status = 'unsubscribed', updated_at = ? WHERE email_norm = ?", [(_now(), e) for e in gone])
+            removed = len(gone)
+        conn.execute("""INSERT INTO sheet_state (id, last_row, synced_at, full_at, last_key) VALUES (1, ?, ?, ?, ?)
+                        ON CONFLICT(id) DO UPDATE SET last_row = excluded.last_row, synced_at = excluded.synced_at,
+                        full_at = COALESCE(excluded.full_at, full_at), last_key = COALESCE(excluded.last_key, last_key)""",
+                     (last_row + len(rows), _now(), _now() if last_row == 1 else None, _row_key(rows[-1]) if rows else None))
+    if removed:
+        print(f"👥 시트에서 빠진 구독자 {removed}명 구독 해지")
+    return added
+
+
+def full_sync_due(days=FULL_SYNC_DAYS):
+    # 마지막 전체 읽기가 days 일 이상 지났으면 True (한 번도 안 읽었어도 True)
+    with connect(DB_NAME) as conn:
+        _init(conn)
+        row = conn.execute("SELECT full_at FROM sheet_state WHERE id = 1").fetchone()
+    if not row or not row[0]:
+        return True
+    return datetime.datetime.now() - datetime.datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S") >= datetime.timedelta(days=days)
+
+
+def push(sheet):
+    # 아직 시트에 없는 가입 신청을 append_rows 한 번으로 일괄 업로드
+    with connect(DB_NAME) as conn:
+        _init(conn)
+        pending = conn.execute("SELECT email_norm, email, subscribed_at, preferences FROM subscribers WHERE synced = 0").fetchall()
+    if not pending:
+        return 0
+    with stage("sheets.append", rows=len(pending)):
+        sheet.append_rows([[email, joined, prefs] for _, email, joined, prefs in pending])
+    with connect(DB_NAME) as conn:
+        conn.executemany("UPDATE subscribers SET synced = 1 WHERE email_norm = ?", [(row[0],) for row in pending])
+    return len(pending)
+
+
+def sync_sheet(sheet, full=False):
+    pushed = push(sheet)
+    pulled = pull(sheet, full)
+    print(f"👥 구독자 동기화: 업로드 {pushed}명 / 신규 {pulled}명")
+    return pushed, pulled
+
+
+def push_later(get_sheet, delay=PUSH_DELAY, attempt=0):
+    # 가입 버튼마다 시트를 열지 않고, 잠시 모았다가 백그라운드에서 한 번에 올립니다
+    # 실패하면 대기 시간을 늘려 가며 다시 예약합니다 (재시작되는 호스트에서 synced = 0 행이 사라지기 전에 올리도록)
+    global _push_timer
+
+    def run():
+        global _push_timer
+        with _push_lock:
+            _push_timer = None
+        try:
+            push(get_sheet())
+        except Exception as e:
+            if attempt >= PUSH_RETRIES:
+                print(f"⚠️ 구독자 시트 업로드 실패 (다음 동기화 때 재시도): {e}")
+                return
+            wait = min(PUSH_RETRY_MAX, PUSH_DELAY * 2 ** (attempt + 1))
+            print(f"⚠️ 구독자 시트 업로드 실패 ({wait}초 후 재시도): {e}")
+            push_later(get_sheet, wait, attempt + 1)
+
+    with _push_lock:
+        if _push_timer is None:
+            _push_timer = threading.Timer(delay, run)
+            _push_timer.daemon = True
+            _push_timer.start()
+
+
+# 크론의 briefing 단계: 샤드 발송 전에 시트를 한 번 동기화해 두고 캐시에 보존합니다
+# (FULL_SYNC_DAYS 마다 한 번은 전체를 다시 읽어 기존 구독자의 관심사 변경까지 반영 — 평소에는 새 행만)
+if __name__ == "__main__":
+    from resources import get_sheet
+    sync_sheet(get_sheet(os.environ.get("GCP_CREDENTIALS")), full=full_sync_due())
@@ -0,0 +1,171 @@
+import os
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ratelimit import TokenBucket
+from resources import get_http_session
+from tracing import stage
+
+# ==========================================
+# 📱 텔레그램 속보 발송기 (세션 재사용 · 메시지 분할 · 다중 채널)
+# ==========================================
+# 로컬 테스트용 가짜 Bot API 서버를 쓰려면 TELEGRAM_API_BASE 를 바꿉니다
+TELEGRAM_API_BASE = os.environ.get("TELEGRAM_API_BASE", "https://api.telegram.org")
+TELEGRAM_MAX_LENGTH = 4096
+# 봇 전체 초당 발송 한도 / 같은 채팅방 연속 메시지 간격(초)
+TELEGRAM_MAX_PER_SECOND = float(os.environ.get("TELEGRAM_MAX_PER_SECOND", "25"))
+TELEGRAM_PER_CHAT_INTERVAL = float(os.environ.get("TELEGRAM_PER_CHAT_INTERVAL", "1.0"))
+TELEGRAM_WORKERS = 8
+TELEGRAM_MAX_RETRIES = 3
+
+# 텔레그램 HTML 모드가 지원하는 태그만 남깁니다
+ALLOWED_TAGS = {"b", "strong", "i", "em", "u", "ins", "s", "strike", "del", "a", "code", "pre", "blockquote", "span", "tg-spoiler"}
+TAG_RE = re.compile(r'(<[^>]+>)')
+TAG_NAME_RE = re.compile(r'<\s*(/?)\s*([a-zA-Z][\w-]*)')
+
+
+def parse_chat_ids(value):
+    # "123, @channel 456" 처럼 쉼표·공백으로 여러 채팅방/채널을 지정할 수 있습니다
+    # secrets.toml 에서는 숫자(-100123…)나 목록([123, "@channel"])으로 올 수도 있습니다
+    if value is None:
+        return []
+    values = value if isinstance(value, (list, tuple)) else [value]
+    return [c for v in values for c in re.split(r'[\s,]+', str(v)) if c]
+
+
+def to_telegram_html(text):
+    # 기존 변환(<br> → 줄바꿈, <b> → 🔥) 후 텔레그램이 모르는 태그는 제거
+    text = re.sub(r'(?i)<br\s*/?>', '\n', text).replace("<b>", "🔥 ").replace("</b>", " 🔥")
+    return re.sub(r'</?\s*([a-zA-Z][\w-]*)[^>]*>', lambda m: m.group(0) if m.group(1).lower() in ALLOWED_TAGS else '', text)
+
+
+def _cut_point(token, room):
+    # 줄바꿈 > 공백 순으로 자르고, HTML 엔티티(&amp; 등) 중간은 피합니다
+    cut = token.rfind("\n", 0, room)
+    if cut <= 0:
+        cut = token.rfind(" ", 0, room)
+    if cut <= 0:
+        cut = room
+    amp = token.rfind("&", 0, cut)
+    if amp != -1 and token.find(";", amp) >= cut:
+        cut = amp
+    return cut
+
+
+def split_message(text, limit=TELEGRAM_MAX_LENGTH):
+    # 태그 경계에서만 나누고, 열린 태그는 조각 끝에서 닫았다가 다음 조각 앞에서 다시 엽니다
+    chunks, open_tags = [], []
+    current = prefix = ""
+
+    def closing():
+        return "".join(f"</{name}>" for name, _ in reversed(open_tags))
+
+    def flush():
+        nonlocal current, prefix
+        if current != prefix:
+            chunks.append(current + closing())
+        current = prefix = "".join(tag for _, tag in open_tags)
+
+    for token in TAG_RE.split(text):
+        if not token:
+            continue
+        if token.startswith("<"):
+            match = TAG_NAME_RE.match(token)
+            opens = bool(match) and not match.group(1) and not token.endswith("/>")
+            # 여는 태그는 나중에 붙을 닫는 태그 자리까지 남아 있어야 합니다
+            needed = len(token) + (len(match.group(2)) + 3 if opens else 0)
+            if len(current) + needed + len(closing()) > limit and current != prefix:
+                flush()
+            current += token
+            if opens:
+                open_tags.append((match.group(2).lower(), token))
+            elif match:
+                names = [name for name, _ in open_tags]
+                if match.group(2).lower() in names:
+                    del open_tags[len(names) - 1 - names[::-1].index(match.group(2).lower())]
+            continue
+        while token:
+            room = limit - len(current) - len(closing())
+            if len(token) <= room:
+                current += token
+                break
+            if room <= 0 and current != prefix:
+                flush()
+                continue
+            cut = _cut_point(token, max(room, 1))
+            if cut <= 0:
+                if current != prefix:
+                    flush()
+                    continue
+                cut = max(room, 1)
+            current += token[:cut]
+            token = token[cut:].lstrip("\n")
+            flush()
+    if current != prefix:
+        chunks.append(current + closing())
+    return chunks
+
+
+def send_message(token, chat_id, text, parse_mode="HTML", max_retries=TELEGRAM_MAX_RETRIES):
+    # 429 는 retry_after 만큼 기다렸다가, 5xx·네트워크 오류는 지수 백오프로 재시도합니다
+    url = f"{TELEGRAM_API_BASE}/bot{token}/sendMessage"
+    error = None
+    for attempt in range(1, max_retries + 2):
+        data = {"chat_id": chat_id, "text": text}
+        if parse_mode:
+            data["parse_mode"] = parse_mode
+        try:
+            resp = get_http_session().post(url, data=data, timeout=10)
+            body = resp.json() if resp.content else {}
+        except Exception as e:
+            error = str(e)
+        else:
+            if body.get("ok"):
+                return {"ok": True, "message_id": body["result"]["message_id"], "error": None}
+            error = body.get("description", f"HTTP {resp.status_code}")
+            if resp.status_code == 429:
+                time.sleep(body.get("parameters", {}).get("retry_after", 1))
+                continue
+            if resp.status_code == 400 and parse_mode and "parse" in error.lower():
+                # HTML 해석에 실패하면 태그를 뺀 일반 텍스트로 다시 보냅니다
+                text, parse_mode = re.sub(r'<[^>]+>', '', text), None
+                continue
+            if resp.status_code < 500:
+                return {"ok": False, "message_id": None, "error": error}
+        if attempt <= max_retries:
+            time.sleep(min(30, 2 ** attempt) + random.random())
+    return {"ok": False, "message_id": None, "error": error}
+
+
+def broadcast(token, chat_ids, text, workers=TELEGRAM_WORKERS):
+    # 여러 채팅방/채널에 동시에 보내되 봇 전체 초당 한도를 지키고, 채팅방별 결과를 돌려줍니다
+    chunks = split_message(to_telegram_html(text))
+    bucket = TokenBucket(TELEGRAM_MAX_PER_SECOND)
+
+    def deliver(chat_id):
+        result = {"chat_id": chat_id, "ok": True, "parts": len(chunks), "message_ids": [], "error": None}
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(TELEGRAM_PER_CHAT_INTERVAL)
+            bucket.acquire()
+            sent = send_message(token, chat_id, chunk)
+            if not sent["ok"]:
+                result["ok"], result["error"] = False, sent["error"]
+                break
+            result["message_ids"].append(sent["message_id"])
+        return result
+
+    if not chat_ids:
+        return []
+    with stage("telegram.broadcast", chats=len(chat_ids), parts=len(chunks)) as span:
+        with ThreadPoolExecutor(max_workers=min(workers, len(chat_ids))) as executor:
+            results = list(executor.map(deliver, chat_ids))
+        span["sent"] = sum(r["ok"] for r in results)
+    return results
+
+
+def summarize(results):
+    sent = sum(r["ok"] for r in results)
+    return {"total": len(results), "sent": sent, "failed": len(results) - sent,
+            "failures": {r["chat_id"]: r["error"] for r in results if not r["ok"]}}
@@ -0,0 +1,85 @@
+import collections
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# ==========================================
+# 🔍 단계별 소요 시간 추적 (구조화 JSON 로그 + 프로세스 내 집계)
+# ==========================================
+# EVE_TRACE_LOG=0 이면 로그 출력 없이 집계만 합니다 (벤치마크 등)
+TRACE_LOG = os.environ.get("EVE_TRACE_LOG", "1") != "0"
+# 단계별로 보관할 최근 소요 시간 개수 (p50 / p95 계산용)
+TRACE_SAMPLES = 500
+
+_stats = {}
+_counters = collections.Counter()
+_lock = threading.Lock()
+_trace_id = None
+
+
+def start_trace(name):
+    # 한 번의 작업(예: 모닝 브리핑 발송)에 속한 로그를 같은 trace_id 로 묶습니다
+    global _trace_id
+    _trace_id = f"{name}-{uuid.uuid4().hex[:8]}"
+    return _trace_id
+
+
+def emit(event, **fields):
+    if TRACE_LOG:
+        print(json.dumps({"event": event, "trace": _trace_id, "at": round(time.time(), 3), **fields}, ensure_ascii=False, default=str))
+
+
+def _record(name, ms, ok):
+    with _lock:
+        stat = _stats.get(name)
+        if stat is None:
+            stat = _stats[name] = {"count": 0, "errors": 0, "total_ms": 0.0, "samples": collections.deque(maxlen=TRACE_SAMPLES)}
+        stat["count"] += 1
+        stat["errors"] += not ok
+        stat["total_ms"] += ms
+        stat["samples"].append(ms)
+
+
+@contextmanager
+def stage(name, **fields):
+    # with stage("gemini.generate") as span: ... — span 에 건수 등 필드를 덧붙이면 로그에 함께 남습니다
+    span = dict(fields)
+    started = time.perf_counter()
+    try:
+        yield span
+    except BaseException as e:
+        ms = (time.perf_counter() - started) * 1000
+        _record(name, ms, False)
+        emit("stage", stage=name, ms=round(ms, 1), ok=False, error=f"{type(e).__name__}: {e}", **span)
+        raise
+    ms = (time.perf_counter() - started) * 1000
+    _record(name, ms, True)
+    emit("stage", stage=name, ms=round(ms, 1), ok=True, **span)
+
+
+def incr(name, n=1):
+    # 캐시 적중처럼 시간 없이 횟수만 세는 지표
+    with _lock:
+        _counters[name] += n
+
+
+def stage_summary():
+    # 단계별 호출 수 · 오류 수 · 누적 / p50 / p95 (ms)
+    with _lock:
+        stats = {name: (dict(s), sorted(s["samples"])) for name, s in _stats.items()}
+        counters = dict(_counters)
+    summary = {}
+    for name, (stat, values) in stats.items():
+        summary[name] = {"count": stat["count"], "errors": stat["errors"], "total_ms": round(stat["total_ms"], 1),
+                         "p50_ms": round(values[len(values) // 2], 1),
+                         "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))], 1)}
+    return {"stages": summary, "counters": counters}
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _counters.clear()
@@ -0,0 +1,138 @@
+import asyncio
+import glob
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from storage import data_path
+from tracing import stage
+
+# ==========================================
+# 🎧 음성 브리핑(TTS) 파이프라인 — 스크립트 해시별 MP3 캐시
+# ==========================================
+TTS_VOICE = "ko-KR-SunHiNeural"
+TTS_RATE = "-10%"
+# 보관할 MP3 개수 — 넘으면 오래된 파일부터 삭제
+TTS_MAX_FILES = int(os.environ.get("TTS_MAX_FILES", "30"))
+# 생성 실패 후 재시도까지 기다리는 시간(초) — 연속 실패마다 두 배, 최대 TTS_RETRY_MAX
+TTS_RETRY_SECONDS = 30
+TTS_RETRY_MAX = 600
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tts")
+_inflight = {}
+# 경로 → (연속 실패 횟수, 다시 시도해도 되는 시각) — 일시적인 네트워크 오류로 음성이 영영 안 나오지 않도록
+_failed = {}
+_inflight_lock = threading.Lock()
+
+
+def clean_script(ai_text):
+    # HTML 태그와 날씨 이모지를 빼고 읽을 문장만 남깁니다
+    return re.sub(r'<[^>]+>', '', ai_text).replace("☀️", "").replace("☁️", "").replace("☔", "").replace("☕", "").strip()
+
+
+def audio_path(script):
+    digest = hashlib.sha256(f"{TTS_VOICE}|{TTS_RATE}|{script}".encode("utf-8")).hexdigest()[:24]
+    return data_path("audio", f"{digest}.mp3")
+
+
+def synthesize(script):
+    # 같은 스크립트는 같은 파일을 재사용하고, 없을 때만 edge-tts 로 생성합니다
+    path = audio_path(script)
+    if os.path.exists(path):
+        return path
+    import edge_tts
+
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        with stage("tts.synthesize", chars=len(script)):
+            asyncio.run(edge_tts.Communicate(script, TTS_VOICE, rate=TTS_RATE).save(tmp_path))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict()
+    return path
+
+
+def published_url(briefing_url, path):
+    # 크론이 브리핑 스냅샷(latest.json) 옆에 함께 게시한 MP3 주소
+    return f"{briefing_url.rsplit('/', 1)[0]}/{os.path.basename(path)}"
+
+
+def download(url, path):
+    from resources import get_http_session
+
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        with stage("tts.download"):
+            response = get_http_session().get(url, timeout=15)
+            response.raise_for_status()
+        with open(tmp_path, "wb") as f:
+            f.write(response.content)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict()
+    return path
+
+
+def _produce(script, briefing_url):
+    # 크론이 미리 만들어 게시한 파일이 있으면 받아 쓰고, 없을 때만 직접 생성합니다
+    if briefing_url:
+        path = audio_path(script)
+        try:
+            return download(published_url(briefing_url, path), path)
+        except Exception as e:
+            print(f"🎧 게시된 음성 파일을 받지 못해 직접 생성합니다: {e}")
+    return synthesize(script)
+
+
+def request_audio(script, briefing_url=None):
+    # 백그라운드 생성을 예약하고 파일 경로를 바로 돌려줍니다 (준비 여부는 os.path.exists / is_pending 으로 확인)
+    # briefing_url: 크론 스냅샷(latest.json) 주소 — 같은 폴더에 게시된 MP3 를 먼저 받아 봅니다
+    path = audio_path(script)
+    if os.path.exists(path):
+        try:
+            os.utime(path)  # 최근 사용 표시 (evict 는 오래 안 쓴 파일부터 삭제)
+            return path
+        except OSError:
+            pass  # 확인 직후 다른 스레드의 evict 가 지웠으면 다시 만듭니다
+    now = time.time()
+    with _inflight_lock:
+        # 대기 시간이 끝나고도 한참 다시 요청되지 않은 실패 기록은 정리 (기록이 끝없이 쌓이지 않도록)
+        for stale in [p for p, (_, retry_at) in _failed.items() if retry_at < now - TTS_RETRY_MAX]:
+            del _failed[stale]
+        if path in _inflight or _failed.get(path, (0, 0))[1] > now:
+            return path
+        future = _inflight[path] = _executor.submit(_produce, script, briefing_url)
+    future.add_done_callback(lambda f: _done(path, f))
+    return path
+
+
+def is_pending(path):
+    with _inflight_lock:
+        return path in _inflight
+
+
+def _done(path, future):
+    with _inflight_lock:
+        _inflight.pop(path, None)
+        if future.exception():
+            count = _failed.get(path, (0, 0))[0] + 1
+            _failed[path] = (count, time.time() + min(TTS_RETRY_MAX, TTS_RETRY_SECONDS * 2 ** (count - 1)))
+        else:
+            _failed.pop(path, None)
+    if future.exception():
+        print(f"🎧 음성 생성 실패: {future.exception()}")
+
+
+def evict(max_files=TTS_MAX_FILES):
+    files = sorted(glob.glob(data_path("audio", "*.mp3")), key=os.path.getmtime, reverse=True)
+    for old in files[max_files:]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
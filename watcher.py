@@ -0,0 +1,355 @@
+import argparse
+import collections
+import datetime
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from tracing import emit, incr, stage, start_trace
+
+# ==========================================
+# 🚨 시장 급변 감지기 (장중 1분봉 증분 폴링 → 스트리밍 통계 → 자동 긴급 속보)
+# 실행: python watcher.py [--duration 초] [--dry-run]
+# 재생: python watcher.py --replay 종가.csv  (yf.download(...)["Close"].to_csv() 형식, 항상 dry-run)
+# ==========================================
+WATCH_SYMBOLS = ["^VIX", "^TNX", "KRW=X", "^IXIC", "^KS11"]
+NAMES = {"^VIX": "VIX 공포지수", "^TNX": "미 10년물 금리", "KRW=X": "원/달러 환율", "^IXIC": "나스닥", "^KS11": "코스피"}
+# 종목별 규칙 — level_above: 이 값 이상으로 올라서면 / move_pct: 당일 첫 봉 대비 등락률(%) 절댓값 / zscore: 봉 간 수익률의 이동 z-점수 절댓값
+RULES = {
+    "^VIX": {"level_above": 30, "move_pct": 20, "zscore": 6},
+    "^TNX": {"move_pct": 4, "zscore": 6},
+    "KRW=X": {"move_pct": 1.2, "zscore": 6},
+    "^IXIC": {"move_pct": 3, "zscore": 6},
+    "^KS11": {"move_pct": 3, "zscore": 6},
+}
+# 연속으로 이만큼의 틱에서 조건이 유지돼야 발송 (한 번 튄 시세로 속보가 나가지 않도록) — z-점수는 한 봉짜리 급변이라 즉시
+DEBOUNCE_TICKS = {"level_above": 2, "move_pct": 2, "zscore": 1}
+# 한 번 발송한 규칙은 값이 기준의 이 비율 아래로 충분히 내려와야 다시 발송 대상이 됩니다 (경계선 근처를 오르내릴 때 반복 속보 방지)
+REARM_RATIO = 0.8
+# z-점수: 최근 몇 개의 수익률로 평균·표준편차를 낼지, 최소 표본 수, 조용한 장에서 작은 움직임이 튀어 보이지 않게 할 최소 등락률(%)
+ZSCORE_WINDOW = int(os.environ.get("WATCH_ZSCORE_WINDOW", "120"))
+ZSCORE_MIN_SAMPLES = 30
+ZSCORE_MIN_MOVE_PCT = 0.25
+# 봉 사이가 이보다(초) 벌어지면 장 마감·휴장으로 보고 수익률을 잇지 않습니다
+MAX_GAP_SECONDS = 15 * 60
+# 같은 종목은 한 번 속보를 보낸 뒤 이 시간(초) 동안 다시 보내지 않고, 서로 다른 종목의 속보도 ALERT_MIN_GAP 초 안에는 한 번만
+COOLDOWN_SECONDS = int(os.environ.get("WATCH_COOLDOWN_SECONDS", "1800"))
+ALERT_MIN_GAP = int(os.environ.get("WATCH_ALERT_MIN_GAP", "300"))
+# 폴링 주기(초)와 봉 간격 — 요청 1회에 전 종목을 새 봉만 받아옵니다
+POLL_INTERVAL = float(os.environ.get("WATCH_POLL_INTERVAL", "20"))
+BAR_INTERVAL = "1m"
+# 증분 요청의 시작 시각은 가장 최근 봉보다 이만큼(초) 앞까지만 — 장이 끝난 종목의 마지막 봉(예: 한국 장 중 어제 미국 종가)에
+# 묶여 몇 시간치 봉을 매번 다시 받지 않도록 (늦게 도착하는 봉 · 시세 지연을 고려한 여유)
+POLL_LOOKBACK_SECONDS = 10 * 60
+# 실시간 피드에서 봉 시각이 이보다(초) 오래된 신호는 발송하지 않습니다 (시작 직후 받은 지난 봉 · 지연 시세 고려해 넉넉히)
+STALE_SIGNAL_SECONDS = 30 * 60
+# 속보 AI 분석 제한 시간(초) — 넘으면 지표 요약으로 먼저 발송
+ALERT_LLM_TIMEOUT = 20
+
+
+class RollingStats:
+    # 최근 window 개 값의 평균·표준편차를 값 하나당 O(1)로 갱신 (합·제곱합 유지, window 마다 한 번 다시 합산해 오차 누적 방지)
+    __slots__ = ("values", "total", "total_sq", "pushes")
+
+    def __init__(self, window=ZSCORE_WINDOW):
+        self.values = collections.deque(maxlen=window)
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.pushes = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def push(self, x):
+        if len(self.values) == self.values.maxlen:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(x)
+        self.total += x
+        self.total_sq += x * x
+        self.pushes += 1
+        if self.pushes % self.values.maxlen == 0:
+            self.total = math.fsum(self.values)
+            self.total_sq = math.fsum(v * v for v in self.values)
+
+    def zscore(self, x):
+        n = len(self.values)
+        if n < 2:
+            return 0.0
+        mean = self.total / n
+        var = (self.total_sq - n * mean * mean) / (n - 1)
+        return (x - mean) / math.sqrt(var) if var > 1e-18 else 0.0
+
+
+class _SymbolState:
+    __slots__ = ("day", "ref", "price", "ts", "stats", "streak", "active", "cooled_until")
+
+    def __init__(self, window):
+        self.day = None
+        self.ref = None
+        self.price = None
+        self.ts = None
+        self.stats = RollingStats(window)
+        self.streak = collections.Counter()
+        self.active = set()
+        self.cooled_until = 0.0
+
+
+class ShockDetector:
+    # 틱(종목, 시각, 가격)마다 규칙을 O(1)로 평가합니다 — 시각은 데이터의 봉 시각(epoch 초)이라 재생해도 결과가 같습니다
+    def __init__(self, rules=RULES, window=ZSCORE_WINDOW, min_samples=ZSCORE_MIN_SAMPLES, debounce=DEBOUNCE_TICKS, cooldown=COOLDOWN_SECONDS):
+        self.rules = rules
+        self.window = window
+        self.min_samples = min_samples
+        self.debounce = debounce
+        self.cooldown = cooldown
+        self.state = {}
+
+    def update(self, symbol, ts, price):
+        rules = self.rules.get(symbol)
+        if not rules or not price == price:
+            return []
+        st = self.state.get(symbol)
+        if st is None:
+            st = self.state[symbol] = _SymbolState(self.window)
+
+        day = int(ts // 86400)
+        if st.day != day:
+            st.day, st.ref, st.price = day, price, None
+        elif ts - st.ts > MAX_GAP_SECONDS:
+            st.price = None
+
+        signals = []
+        for rule, threshold in rules.items():
+            if rule == "level_above":
+                value = price
+                hit = price >= threshold
+            elif rule == "move_pct":
+                value = (price / st.ref - 1) * 100
+                hit = abs(value) >= threshold
+            elif rule == "zscore":
+                if st.price is None:
+                    continue
+                ret = price / st.price - 1
+                value = st.stats.zscore(ret) if len(st.stats) >= self.min_samples else 0.0
+                hit = abs(value) >= threshold and abs(ret) * 100 >= ZSCORE_MIN_MOVE_PCT
+                st.stats.push(ret)
+            else:
+                continue
+
+            if not hit:
+                st.streak[rule] = 0
+                if abs(value) < threshold * REARM_RATIO:
+                    st.active.discard(rule)
+                continue
+            st.streak[rule] += 1
+            # 조건이 충분히 풀렸다가 다시 걸릴 때만 한 번 (수준 돌파가 이어지는 동안 반복 발송하지 않음)
+            if rule in st.active or st.streak[rule] < self.debounce.get(rule, 1):
+                continue
+            st.active.add(rule)
+            if ts < st.cooled_until:
+                incr("watcher.cooldown")
+                continue
+            st.cooled_until = ts + self.cooldown
+            signals.append(_signal(symbol, rule, value, threshold, price, ts))
+
+        st.price, st.ts = price, ts
+        return signals
+
+
+def _signal(symbol, rule, value, threshold, price, ts):
+    name = NAMES.get(symbol, symbol)
+    if rule == "level_above":
+        message = f"{name} {price:,.2f} — 경계선 {threshold} 돌파"
+    elif rule == "move_pct":
+        message = f"{name} 장중 {value:+.2f}% 급변 ({price:,.2f})"
+    else:
+        message = f"{name} 1분 변동 이상치 (z={value:+.1f}, {price:,.2f})"
+    return {"symbol": symbol, "rule": rule, "value": round(value, 3), "threshold": threshold, "price": price, "ts": ts,
+            "at": datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).isoformat(), "message": message}
+
+
+def _to_ticks(closes, after):
+    # 종가 표(봉 시각 × 종목)에서 종목별로 after[종목] 이후의 봉만 (epoch 초, 종목, 가격) 으로 꺼내 시각순 정렬
+    index = closes.index.tz_convert("UTC") if closes.index.tz is not None else closes.index.tz_localize("UTC")
+    seconds = (index - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+    ticks = []
+    for sym in closes.columns:
+        column = closes[sym].to_numpy()
+        since = after.get(sym, -1)
+        ticks += [(float(ts), sym, float(p)) for ts, p in zip(seconds, column) if ts > since and p == p]
+    ticks.sort(key=lambda t: t[0])
+    return ticks
+
+
+class YahooFeed:
+    # 장중 1분봉 증분 폴링: 첫 요청만 당일 전체, 이후에는 최근 POLL_LOOKBACK_SECONDS 안쪽의 봉만 요청하고
+    # 종목별로 마지막으로 본 봉 이후만 흘려보냅니다 (첫 요청에 봉이 없던 종목도 장이 열리면 같은 창으로 따라잡음)
+    # 진행 중인 봉은 처음 본 순간의 가격으로 한 번만 흘려보냅니다 (다음 봉부터 다시 새 틱)
+    live = True
+
+    def __init__(self, symbols=WATCH_SYMBOLS, interval=BAR_INTERVAL):
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.last = {}
+        self.primed = False
+        self.done = False
+
+    def poll(self):
+        import yfinance as yf
+
+        if self.primed and self.last:
+            start = max(min(self.last.values()), max(self.last.values()) - POLL_LOOKBACK_SECONDS)
+            kwargs = {"start": datetime.datetime.fromtimestamp(start, datetime.timezone.utc)}
+        else:
+            kwargs = {"period": "1d"}
+        with stage("watcher.poll", symbols=len(self.symbols)) as span:
+            raw = yf.download(self.symbols, interval=self.interval, group_by="column", auto_adjust=True, threads=True, progress=False, **kwargs)
+            closes = raw["Close"] if isinstance(raw.columns, pd.MultiIndex) else raw[["Close"]].set_axis(self.symbols[:1], axis=1)
+            ticks = _to_ticks(closes, self.last)
+            span["ticks"] = len(ticks)
+        for ts, sym, _ in ticks:
+            self.last[sym] = ts
+        self.primed = True
+        return ticks
+
+
+class ReplayFeed:
+    # 저장해 둔 종가 표를 봉 시각 단위로 한 묶음씩 흘려보냅니다 (네트워크 없이 감지 규칙·지연 시험용)
+    live = False
+
+    def __init__(self, closes):
+        ticks = _to_ticks(closes, {})
+        self.batches = [list(group) for _, group in itertools.groupby(ticks, key=lambda t: t[0])]
+        self.position = 0
+
+    @classmethod
+    def from_csv(cls, path):
+        closes = pd.read_csv(path, index_col=0)
+        closes.index = pd.to_datetime(closes.index, utc=True)
+        return cls(closes)
+
+    @property
+    def done(self):
+        return self.position >= len(self.batches)
+
+    def poll(self):
+        if self.done:
+            return []
+        self.position += 1
+        return self.batches[self.position - 1]
+
+
+class Watcher:
+    # 폴링 → 감지 → 속보 발송. 발송은 별도 스레드 1개에서 순서대로 처리해 그동안에도 폴링이 멈추지 않습니다
+    def __init__(self, feed, detector, on_alert, min_gap=ALERT_MIN_GAP):
+        self.feed = feed
+        self.detector = detector
+        self.on_alert = on_alert
+        self.min_gap = min_gap
+        self.last_alert = None
+        self.alerts = []
+        self.ticks = 0
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shock-alert")
+
+    def step(self):
+        ticks = self.feed.poll()
+        signals = [s for ts, sym, price in ticks for s in self.detector.update(sym, ts, price)]
+        self.ticks += len(ticks)
+        if signals:
+            self._alert(signals)
+        return signals
+
+    def _alert(self, signals):
+        detected_at = time.time()
+        for s in signals:
+            emit("shock_detected", **s)
+        if self.feed.live:
+            signals = [s for s in signals if detected_at - s["ts"] <= STALE_SIGNAL_SECONDS]
+            if not signals:
+                incr("watcher.stale")
+                return
+        if self.last_alert is not None and signals[-1]["ts"] - self.last_alert < self.min_gap:
+            incr("watcher.suppressed")
+            print(f"⏸️ 직전 속보 후 {self.min_gap}초 이내라 건너뜁니다: {' / '.join(s['message'] for s in signals)}")
+            return
+        self.last_alert = signals[-1]["ts"]
+        self.alerts.append(self.executor.submit(self._dispatch, signals, detected_at))
+
+    def _dispatch(self, signals, detected_at):
+        try:
+            with stage("watcher.alert", signals=len(signals)):
+                result = self.on_alert(signals)
+        except Exception as e:
+            print(f"❌ 긴급 속보 발송 실패: {e}")
+            return None
+        # 감지 → 발송 완료까지의 지연 (실시간 피드는 봉 시각 → 감지까지의 데이터 지연도 함께)
+        fields = {"latency_s": round(time.time() - detected_at, 3)}
+        if self.feed.live:
+            fields["bar_age_s"] = round(detected_at - signals[-1]["ts"], 1)
+        emit("shock_alert", symbols=sorted({s["symbol"] for s in signals}), **fields)
+        return result
+
+    def run(self, interval=POLL_INTERVAL, duration=None):
+        deadline = time.monotonic() + duration if duration else None
+        try:
+            while not self.feed.done and (deadline is None or time.monotonic() < deadline):
+                started = time.monotonic()
+                try:
+                    self.step()
+                except Exception as e:
+                    incr("watcher.poll_failed")
+                    print(f"⚠️ 시세 폴링 실패 (다음 주기에 재시도): {type(e).__name__} {e}")
+                if interval:
+                    time.sleep(max(0.0, interval - (time.monotonic() - started)))
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+def issue_text(signals):
+    return "시장 급변 자동 감지 — " + " / ".join(s["message"] for s in signals)
+
+
+def send_shock_alert(signals):
+    # 관리자 관제실의 긴급 속보와 같은 흐름으로 발송 (🔒 깃허브 비밀 금고(환경 변수)에서 정보 꺼내기)
+    from alerts import send_alert
+    from resources import get_model
+    from telegram_bot import parse_chat_ids
+
+    result = send_alert(issue_text(signals), get_model(os.environ.get("API_KEY")), os.environ.get("SENDER_EMAIL"), os.environ.get("APP_PASSWORD"),
+                        os.environ.get("GCP_CREDENTIALS"), os.environ.get("TELEGRAM_BOT_TOKEN"), parse_chat_ids(os.environ.get("TELEGRAM_CHAT_ID")),
+                        llm_timeout=ALERT_LLM_TIMEOUT)
+    print(f"🚨 긴급 속보 발송: 이메일 {result['email']['sent']}/{result['email']['total']}명, "
+          f"텔레그램 {result['telegram']['sent']}/{result['telegram']['total']}곳")
+    return result
+
+
+def print_alert(signals):
+    print(f"🚨 [dry-run] {signals[-1]['at']} {issue_text(signals)}")
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="이브(Eve) 시장 급변 감지기")
+    parser.add_argument("--replay", metavar="CSV", help="저장된 종가 표(봉 시각 × 종목)를 재생 (발송 없이 출력만)")
+    parser.add_argument("--duration", type=float, help="이 시간(초)만 감시하고 종료")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="폴링 주기(초)")
+    parser.add_argument("--dry-run", action="store_true", help="속보를 발송하지 않고 출력만")
+    args = parser.parse_args()
+
+    start_trace("watcher")
+    feed = ReplayFeed.from_csv(args.replay) if args.replay else YahooFeed()
+    on_alert = print_alert if args.replay or args.dry_run else send_shock_alert
+    watcher = Watcher(feed, ShockDetector(), on_alert)
+    print(f"[{datetime.datetime.now()}] 👀 이브(Eve)가 {', '.join(WATCH_SYMBOLS)} 급변 감시를 시작합니다...")
+    started = time.perf_counter()
+    watcher.run(0 if args.replay else args.interval, args.duration)
+    elapsed = time.perf_counter() - started
+    print(f"🏁 감시 종료: 틱 {watcher.ticks:,}개, 속보 {len(watcher.alerts)}건, {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()